@@ -0,0 +1,94 @@
+"""Cross-worker change tracking for process-local caches.
+
+Every gunicorn worker keeps its own caches, so a write handled by one worker
+must reach the others. Writers call bump() inside their transaction; readers
+ask data_versions for the current counters, which are re-read from the
+data_versions table at most every DATA_VERSION_POLL_SECONDS (one small query
+shared by all caches). The writing worker sees its own change immediately.
+"""
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import DataVersion
+
+DATA_VERSION_POLL_SECONDS = float(os.getenv("DATA_VERSION_POLL_SECONDS", "2"))
+
+# Entities bumped by writers outside their own service module
+ATTENDANCE_ENTITY = "attendance"
+TRAINEES_ENTITY = "trainees"
+
+
+def _insert(db: Session):
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(DataVersion)
+
+
+def bump(db: Session, entity: str) -> None:
+    """Increment an entity's version as part of the caller's transaction.
+
+    One upsert, so the first writes of a new entity from two workers at once
+    can't both try to insert its row.
+    """
+    stmt = _insert(db).values(entity=entity, version=1)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[DataVersion.entity],
+        set_={"version": DataVersion.__table__.c.version + 1},
+    ))
+    db.info["bumped_data_versions"] = True
+
+
+def read_versions(db: Session, *entities: str) -> dict[str, int]:
+    """Current versions straight from the table, for callers that can't accept poll staleness."""
+    rows = db.query(DataVersion.entity, DataVersion.version).filter(DataVersion.entity.in_(entities)).all()
+    return {entity: dict(rows).get(entity, 0) for entity in entities}
+
+
+class VersionTracker:
+    def __init__(self, poll_seconds: float):
+        self._poll_seconds = poll_seconds
+        self._versions: dict[str, int] = {}
+        self._checked_at = float("-inf")
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, entity: str) -> int:
+        if time.monotonic() - self._checked_at < self._poll_seconds:
+            return self._versions.get(entity, 0)
+
+        generation = self._generation
+        started = time.monotonic()
+        # No lock is held across the query: under AsyncSession.run_sync it yields to the
+        # event loop, and another request on the same thread waiting for the lock would hang it
+        versions = dict(db.query(DataVersion.entity, DataVersion.version).all())
+        with self._lock:
+            # A refresh that raced a local bump must not mark the tracker fresh again
+            if generation == self._generation and started > self._checked_at:
+                self._versions = versions
+                self._checked_at = started
+        return versions.get(entity, 0)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._checked_at = float("-inf")
+
+
+data_versions = VersionTracker(DATA_VERSION_POLL_SECONDS)
+
+
+@event.listens_for(Session, "after_commit")
+def _refresh_after_local_bump(session: Session) -> None:
+    if session.info.pop("bumped_data_versions", False):
+        data_versions.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_bump(session: Session) -> None:
+    session.info.pop("bumped_data_versions", None)
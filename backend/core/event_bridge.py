@@ -0,0 +1,121 @@
+"""Relays dashboard events between gunicorn workers over Postgres LISTEN/NOTIFY.
+
+Each worker listens on one dedicated connection, read from the event loop
+via add_reader (no thread per worker). Messages are tagged with the sending
+worker's id so it can skip its own. On other databases the bridge stays off
+and events only reach sockets connected to the same worker.
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import uuid
+from typing import Callable
+
+from sqlalchemy import text
+
+from database import engine
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "scanin_events"
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+class PgEventBridge:
+    def __init__(self, on_message: Callable[[dict], None]):
+        self._on_message = on_message
+        self._task: asyncio.Task | None = None
+        self._publishes: set[asyncio.Task] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return engine.dialect.name == "postgresql"
+
+    def start(self) -> None:
+        if self.enabled:
+            self._task = asyncio.create_task(self._listen_forever())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def publish(self, message: dict) -> None:
+        """Send to the other workers without waiting for the database."""
+        if not self.enabled:
+            return
+        payload = json.dumps({"origin": WORKER_ID, "message": message}, default=str)
+        task = asyncio.create_task(asyncio.to_thread(self._notify, payload))
+        self._publishes.add(task)
+        task.add_done_callback(self._publish_done)
+
+    def _publish_done(self, task: asyncio.Task) -> None:
+        self._publishes.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Could not publish dashboard event: %s", task.exception())
+
+    @staticmethod
+    def _notify(payload: str) -> None:
+        with engine.begin() as conn:
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": CHANNEL, "payload": payload})
+
+    @staticmethod
+    def _open_listener():
+        import psycopg2
+
+        cargs, cparams = engine.dialect.create_connect_args(engine.url)
+        # TCP keepalives make a silently dropped connection raise instead of going quiet forever
+        conn = psycopg2.connect(*cargs, **cparams, keepalives=1, keepalives_idle=30, keepalives_interval=10, keepalives_count=3)
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute(f"LISTEN {CHANNEL}")
+        return conn
+
+    async def _listen_forever(self) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                conn = await asyncio.to_thread(self._open_listener)
+                logger.info("Listening for dashboard events from other workers")
+                backoff = 1.0
+                error = await self._pump(conn)
+                logger.warning("Event bridge connection lost: %s", error)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Event bridge unavailable, retrying in %.0fs: %s", backoff, e)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    async def _pump(self, conn) -> Exception:
+        loop = asyncio.get_running_loop()
+        broken: asyncio.Future = loop.create_future()
+        fd = conn.fileno()
+
+        def on_readable() -> None:
+            try:
+                conn.poll()
+            except Exception as e:
+                if not broken.done():
+                    broken.set_result(e)
+                return
+            while conn.notifies:
+                self._dispatch(conn.notifies.pop(0).payload)
+
+        loop.add_reader(fd, on_readable)
+        try:
+            return await broken
+        finally:
+            loop.remove_reader(fd)
+            conn.close()
+
+    def _dispatch(self, payload: str) -> None:
+        try:
+            envelope = json.loads(payload)
+        except ValueError:
+            return
+        if envelope.get("origin") != WORKER_ID:
+            self._on_message(envelope["message"])
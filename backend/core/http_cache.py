@@ -0,0 +1,95 @@
+"""ETags and a process-local response cache for read endpoints, keyed on data versions.
+
+A response's ETag is the versions of the entities it reads (plus today's date,
+for endpoints whose defaults are relative to today). Checking it costs no query
+while data_versions is fresh, so a browser revalidating unchanged data gets a
+304, and another client asking for the same URL gets the stored body, without
+touching the database. Other workers' writes show up within
+DATA_VERSION_POLL_SECONDS.
+"""
+import os
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Awaitable, Callable
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from core.data_version import data_versions
+
+RESPONSE_CACHE_ENTRIES = int(os.getenv("RESPONSE_CACHE_ENTRIES", "256"))
+RESPONSE_CACHE_MAX_MB = float(os.getenv("RESPONSE_CACHE_MAX_MB", "32"))
+
+
+class ResponseCache:
+    """LRU of serialized JSON bodies, bounded by entry count and total size."""
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, bytes] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple) -> bytes | None:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key: tuple, body: bytes) -> None:
+        if len(body) > self._max_bytes // 4:
+            return  # one huge page would evict everything else
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = body
+            self._bytes += len(body)
+            while len(self._entries) > self._max_entries or self._bytes > self._max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_ENTRIES, int(RESPONSE_CACHE_MAX_MB * 1024 * 1024))
+
+
+def _etag(db: Session, entities: tuple[str, ...]) -> str:
+    versions = ".".join(f"{entity[0]}{data_versions.get(db, entity)}" for entity in entities)
+    return f'W/"{versions}.{date.today():%Y%m%d}"'
+
+
+async def cached_json(
+    request: Request, db: AsyncSession, entities: tuple[str, ...], build: Callable[[], Awaitable[object]],
+) -> Response:
+    """Answer a GET from its ETag or the response cache, awaiting build() only on a miss.
+
+    build() returns what the endpoint would have returned; HTTPExceptions it raises
+    pass through and are never cached.
+    """
+    # Read versions before the data, so a body is never stored under a newer version than it shows
+    etag = await db.run_sync(_etag, entities)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    key = (request.url.path, request.url.query, etag)
+    body = response_cache.get(key)
+    if body is None:
+        body = JSONResponse(jsonable_encoder(await build())).body
+        response_cache.put(key, body)
+    return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,158 @@
+import json
+import logging
+from datetime import datetime
+from typing import Callable
+
+from sqlalchemy import LargeBinary, String, inspect, text
+from sqlalchemy.engine import Connection
+
+from database import engine
+from services.embedding_codec import encode_embedding
+
+logger = logging.getLogger(__name__)
+
+# Arbitrary constant so concurrent gunicorn workers run migrations one at a time
+_LOCK_KEY = 4_721_055
+
+_BATCH_SIZE = 500
+
+
+def _face_embeddings_to_binary(conn: Connection) -> None:
+    """Convert face_embeddings.embedding from JSON text to encoded float32 blobs."""
+    columns = {c["name"]: c for c in inspect(conn).get_columns("face_embeddings")}
+    column = columns.get("embedding")
+    if column is None or not isinstance(column["type"], String):
+        return  # fresh database — create_all already made it binary
+
+    blob_type = LargeBinary().compile(dialect=conn.dialect)
+    conn.execute(text(f"ALTER TABLE face_embeddings ADD COLUMN embedding_bin {blob_type}"))
+
+    converted = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            text("SELECT id, embedding FROM face_embeddings WHERE id > :last_id ORDER BY id LIMIT :limit"),
+            {"last_id": last_id, "limit": _BATCH_SIZE},
+        ).all()
+        if not rows:
+            break
+        conn.execute(
+            text("UPDATE face_embeddings SET embedding_bin = :blob WHERE id = :id"),
+            [{"id": row.id, "blob": encode_embedding(json.loads(row.embedding))} for row in rows],
+        )
+        converted += len(rows)
+        last_id = rows[-1].id
+
+    conn.execute(text("ALTER TABLE face_embeddings DROP COLUMN embedding"))
+    conn.execute(text("ALTER TABLE face_embeddings RENAME COLUMN embedding_bin TO embedding"))
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("ALTER TABLE face_embeddings ALTER COLUMN embedding SET NOT NULL"))
+    logger.info("Converted %d face embeddings to binary float32", converted)
+
+
+def _face_embeddings_pose(conn: Connection) -> None:
+    """Tag embeddings with their registration pose; existing rows are per-trainee averages."""
+    columns = {c["name"] for c in inspect(conn).get_columns("face_embeddings")}
+    if "pose" in columns:
+        return
+    conn.execute(text("ALTER TABLE face_embeddings ADD COLUMN pose TEXT"))
+    conn.execute(text("UPDATE face_embeddings SET pose = 'average'"))
+
+
+def _attendance_unique_per_day(conn: Connection) -> None:
+    """Merge duplicate (trainee_id, date) attendance rows, then add the unique index."""
+    duplicates = conn.execute(text(
+        "SELECT trainee_id, date FROM attendance GROUP BY trainee_id, date HAVING COUNT(*) > 1"
+    )).all()
+    for trainee_id, day in duplicates:
+        rows = conn.execute(
+            text("SELECT * FROM attendance WHERE trainee_id = :trainee_id AND date = :day ORDER BY id"),
+            {"trainee_id": trainee_id, "day": day},
+        ).mappings().all()
+        keep = rows[0]
+        checkins = [row for row in rows if row["checkin_time"] is not None]
+        checkouts = [row for row in rows if row["checkout_time"] is not None]
+        first_in = min(checkins, key=lambda row: row["checkin_time"]) if checkins else keep
+        last_out = max(checkouts, key=lambda row: row["checkout_time"]) if checkouts else keep
+        conn.execute(
+            text(
+                "UPDATE attendance SET checkin_time = :checkin_time, checkin_image = :checkin_image, "
+                "checkout_time = :checkout_time, checkout_image = :checkout_image, status = :status WHERE id = :id"
+            ),
+            {
+                "id": keep["id"],
+                "checkin_time": first_in["checkin_time"],
+                "checkin_image": first_in["checkin_image"],
+                "status": first_in["status"],
+                "checkout_time": last_out["checkout_time"],
+                "checkout_image": last_out["checkout_image"],
+            },
+        )
+        conn.execute(
+            text("DELETE FROM attendance WHERE trainee_id = :trainee_id AND date = :day AND id <> :id"),
+            {"trainee_id": trainee_id, "day": day, "id": keep["id"]},
+        )
+    if duplicates:
+        logger.info("Merged duplicate attendance rows for %d trainee-days", len(duplicates))
+    conn.execute(text(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_attendance_trainee_date ON attendance (trainee_id, date)"
+    ))
+
+
+def _attendance_history_index(conn: Connection) -> None:
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_attendance_history ON attendance (date, checkin_time, id)"))
+
+
+def _attendance_history_index_order(conn: Connection) -> None:
+    """Recreate ix_attendance_history in the history order, so Postgres can scan it without sorting."""
+    # SQLite rejects NULLS LAST in an index, but its DESC already puts NULLs last
+    nulls_last = " NULLS LAST" if conn.dialect.name == "postgresql" else ""
+    conn.execute(text("DROP INDEX IF EXISTS ix_attendance_history"))
+    conn.execute(text(
+        f"CREATE INDEX ix_attendance_history ON attendance (date DESC, checkin_time DESC{nulls_last}, id DESC)"
+    ))
+
+
+def _daily_summaries_backfill(conn: Connection) -> None:
+    """Fill daily_summaries from existing attendance; from here on writes keep it current."""
+    conn.execute(text("DELETE FROM daily_summaries"))
+    conn.execute(text(
+        "INSERT INTO daily_summaries (date, present, late, checked_in) "
+        "SELECT date, "
+        "SUM(CASE WHEN status = 'present' THEN 1 ELSE 0 END), "
+        "SUM(CASE WHEN status = 'late' THEN 1 ELSE 0 END), "
+        "COUNT(*) "
+        "FROM attendance WHERE checkin_time IS NOT NULL GROUP BY date"
+    ))
+
+
+# Append new migrations at the end; names are recorded in schema_migrations once applied.
+# Each step must be a no-op on a schema that create_all() has already built.
+MIGRATIONS: list[tuple[str, Callable[[Connection], None]]] = [
+    ("0001_face_embeddings_binary", _face_embeddings_to_binary),
+    ("0002_face_embeddings_pose", _face_embeddings_pose),
+    ("0003_attendance_unique_per_day", _attendance_unique_per_day),
+    ("0004_attendance_history_index", _attendance_history_index),
+    ("0005_daily_summaries_backfill", _daily_summaries_backfill),
+    ("0006_attendance_history_index_order", _attendance_history_index_order),
+]
+
+
+def run_migrations() -> None:
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _LOCK_KEY})
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations (name TEXT PRIMARY KEY, applied_at TIMESTAMP NOT NULL)"
+        ))
+        applied = set(conn.execute(text("SELECT name FROM schema_migrations")).scalars())
+
+        for name, migrate in MIGRATIONS:
+            if name in applied:
+                continue
+            logger.info("Applying migration %s", name)
+            migrate(conn)
+            conn.execute(
+                text("INSERT INTO schema_migrations (name, applied_at) VALUES (:name, :applied_at)"),
+                {"name": name, "applied_at": datetime.utcnow()},
+            )
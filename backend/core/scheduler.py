@@ -4,8 +4,9 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 
 from database import SessionLocal
-from models import Attendance, Setting, Trainee
+from models import Attendance, Trainee
 from services.notification_service import SMTP_USER, alert_admin_absent
+from services.settings_service import get_app_settings
 
 scheduler = AsyncIOScheduler()
 
@@ -13,9 +14,7 @@ scheduler = AsyncIOScheduler()
 def schedule_absent_alert() -> None:
     db = SessionLocal()
     try:
-        setting = db.query(Setting).filter(Setting.key == "work_start_time").first()
-        work_start = setting.value if setting else "09:00"
-        h, m = map(int, work_start.split(":"))
+        h, m = map(int, get_app_settings(db).work_start_time.split(":"))
         total_minutes = h * 60 + m + 30
         run_hour = total_minutes // 60
         run_minute = total_minutes % 60
@@ -42,6 +41,7 @@ def _check_and_alert_absent() -> None:
         }
         absent_names = [t.unique_name for t in all_trainees if t.id not in checked_in_ids]
         if absent_names and SMTP_USER:
-            alert_admin_absent(SMTP_USER, absent_names)
+            alert_admin_absent(db, SMTP_USER, absent_names)
+            db.commit()
     finally:
         db.close()
@@ -1,7 +1,25 @@
+import logging
+import time
+from contextlib import contextmanager
+
 from passlib.context import CryptContext
 
 from database import SessionLocal
 from models import Admin, Setting
+from services.settings_service import mark_settings_changed
+
+logger = logging.getLogger(__name__)
+
+# Seconds spent in each startup phase, reported by /ready
+startup_timings: dict[str, float] = {}
+
+
+@contextmanager
+def startup_phase(name: str):
+    started = time.perf_counter()
+    yield
+    startup_timings[name] = round(time.perf_counter() - started, 3)
+    logger.info("Startup phase %s took %.3fs", name, startup_timings[name])
 
 
 def seed_defaults() -> None:
@@ -18,9 +36,11 @@ def seed_defaults() -> None:
             "grace_period_minutes": "10",
             "liveness_check_enabled": "true",
         }
-        for key, value in defaults.items():
-            if not db.query(Setting).filter(Setting.key == key).first():
-                db.add(Setting(key=key, value=value))
+        missing = [key for key in defaults if not db.query(Setting).filter(Setting.key == key).first()]
+        for key in missing:
+            db.add(Setting(key=key, value=defaults[key]))
+        if missing:
+            mark_settings_changed(db)
 
         db.commit()
     finally:
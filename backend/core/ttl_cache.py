@@ -0,0 +1,56 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Small thread-safe mapping whose entries expire ttl seconds after they are set.
+
+    Every entry shares the same ttl, so insertion order is also expiry order and
+    expired entries (or the oldest ones, past max_size) are evicted from the front.
+    """
+
+    def __init__(self, ttl: float, max_size: int = 1024):
+        self._ttl = ttl
+        self._max_size = max_size
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float) -> None:
+        while self._data:
+            key, (expires_at, _) = next(iter(self._data.items()))
+            if expires_at > now and len(self._data) <= self._max_size:
+                break
+            del self._data[key]
+
+    def set(self, key, value) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (now + self._ttl, value)
+            self._evict(now)
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            entry = self._data.get(key)
+            return entry[1] if entry else default
+
+    def pop(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            entry = self._data.pop(key, None)
+            return entry[1] if entry else default
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._evict(time.monotonic())
+            return len(self._data)
+
+
+_MISSING = object()
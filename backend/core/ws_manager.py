@@ -1,29 +1,102 @@
-from typing import List
+import asyncio
+import logging
+import os
+from collections import deque
 
 from fastapi import WebSocket
 
+from core.event_bridge import PgEventBridge
+
+logger = logging.getLogger(__name__)
+
+# Events buffered per dashboard socket; when full the oldest is dropped. The dashboard
+# refetches on every event and shows only the latest few, so losing old ones is harmless.
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "16"))
+# A socket that can't take one message in this long is closed; the browser reconnects
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "5"))
+
+
+class _Client:
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: deque[dict] = deque(maxlen=queue_size)
+        self.ready = asyncio.Event()
+        self.dropped = 0
+        self.writer: asyncio.Task | None = None
+
+    def offer(self, message: dict) -> None:
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+        self.queue.append(message)
+        self.ready.set()
+
 
 class ConnectionManager:
+    """Fans dashboard events out to every connected socket, in this worker and the others.
+
+    broadcast() never waits on a socket: each connection has its own bounded queue
+    drained by a writer task, so a slow browser only delays itself.
+    """
+
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self._clients: dict[WebSocket, _Client] = {}
+        self._bridge = PgEventBridge(self._deliver)
+
+    @property
+    def active_connections(self) -> list[WebSocket]:
+        return list(self._clients)
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        client = _Client(websocket, WS_SEND_QUEUE_SIZE)
+        client.writer = asyncio.create_task(self._write(client))
+        self._clients[websocket] = client
 
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        client = self._clients.pop(websocket, None)
+        if client is not None and client.writer is not None and client.writer is not asyncio.current_task():
+            client.writer.cancel()
+
+    def broadcast(self, message: dict) -> None:
+        """Queue an event for local sockets and publish it to the other workers."""
+        self._deliver(message)
+        self._bridge.publish(message)
+
+    def _deliver(self, message: dict) -> None:
+        for client in list(self._clients.values()):
+            client.offer(message)
 
-    async def broadcast(self, message: dict):
-        disconnected = []
-        for connection in self.active_connections:
+    async def _write(self, client: _Client) -> None:
+        try:
+            while True:
+                await client.ready.wait()
+                client.ready.clear()
+                while client.queue:
+                    message = client.queue.popleft()
+                    await asyncio.wait_for(client.websocket.send_json(message), WS_SEND_TIMEOUT_SECONDS)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.info("Dropping dashboard socket: %s", e or type(e).__name__)
+            self.disconnect(client.websocket)
             try:
-                await connection.send_json(message)
+                await client.websocket.close()
             except Exception:
-                disconnected.append(connection)
-        for conn in disconnected:
-            self.disconnect(conn)
+                pass
+
+    def start(self) -> None:
+        self._bridge.start()
+
+    async def stop(self) -> None:
+        await self._bridge.stop()
+        for websocket in list(self._clients):
+            self.disconnect(websocket)
+
+    def metrics(self) -> dict:
+        return {
+            "connections": len(self._clients),
+            "dropped_events": sum(client.dropped for client in self._clients.values()),
+        }
 
 
 manager = ConnectionManager()
@@ -1,5 +1,7 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.engine import URL
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from dotenv import load_dotenv
 
@@ -9,15 +11,45 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL environment variable is not set")
 
+# Sync engine: startup, migrations, the scheduler and background workers
 engine = create_engine(DATABASE_URL)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def async_database_url(url: str) -> tuple[URL, dict]:
+    """The same database through an asyncio driver, plus its connect_args."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend == "postgresql":
+        query = dict(url.query)
+        # asyncpg takes ssl= where libpq takes sslmode=, and knows nothing of channel_binding
+        sslmode = query.pop("sslmode", None)
+        query.pop("channel_binding", None)
+        connect_args = {"ssl": sslmode} if sslmode else {}
+        return url.set(drivername="postgresql+asyncpg", query=query), connect_args
+    if backend == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite"), {}
+    raise RuntimeError(f"No async driver configured for {backend} databases")
+
+
+# Async engine: request handlers, so database round trips don't block the event loop
+_async_url, _async_connect_args = async_database_url(DATABASE_URL)
+async_engine = create_async_engine(_async_url, connect_args=_async_connect_args)
+
+# Objects stay loaded after commit; an expired attribute can't lazy-load outside the session's greenlet
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
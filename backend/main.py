@@ -7,30 +7,62 @@ logging.basicConfig(
     format="%(asctime)s %(levelname)s %(name)s — %(message)s",
 )
 
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 
 from core.limiter import limiter
-from database import engine, Base
+from database import async_engine, engine, Base
 from routers import auth, trainees, attendance as attendance_router, reports, settings
 from routers import analytics, websocket as websocket_router
-from core.startup import seed_defaults
+from core.migrations import run_migrations
+from core.startup import seed_defaults, startup_phase, startup_timings
 from core.scheduler import scheduler, schedule_absent_alert
+from core.ws_manager import manager as ws_manager
+from core.http_cache import response_cache
+from dependencies import get_current_admin
+from services.inference_service import InferenceBusyError, inference_executor
+from services.gallery_service import gallery
+from services.inference_backends import FACE_BACKEND
+from services import local_liveness
+from services.liveness_service import close_client as close_liveness_client, get_liveness_metrics
+from services.model_registry import MODEL_LOAD_MODE, model_registry
+from services.storage_service import capture_uploader
+from services.email_outbox import outbox_sender
+from services.report_jobs import report_jobs
 
 _IS_PRODUCTION = os.getenv("ENVIRONMENT") == "production"
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    Base.metadata.create_all(bind=engine)
-    seed_defaults()
-    schedule_absent_alert()
-    scheduler.start()
+    with startup_phase("create_tables"):
+        Base.metadata.create_all(bind=engine)
+    with startup_phase("migrations"):
+        run_migrations()
+    with startup_phase("seed_defaults"):
+        seed_defaults()
+    with startup_phase("scheduler"):
+        schedule_absent_alert()
+        scheduler.start()
+    # Loads and warms up FaceNet in the background (MODEL_LOAD_MODE) so /health answers at once
+    model_registry.start()
+    capture_uploader.start()
+    outbox_sender.start()
+    ws_manager.start()
     yield
+    await ws_manager.stop()
+    await outbox_sender.stop()
+    await capture_uploader.stop()
     scheduler.shutdown(wait=False)
+    inference_executor.shutdown()
+    report_jobs.shutdown()
+    gallery.persist_ann()
+    await close_liveness_client()
+    await async_engine.dispose()
 
 
 app = FastAPI(
@@ -45,6 +77,12 @@ app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 app.add_middleware(SlowAPIMiddleware)
 
+
+@app.exception_handler(InferenceBusyError)
+async def inference_busy_handler(request: Request, exc: InferenceBusyError):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "2"})
+
+
 # allow_credentials=True is incompatible with allow_origins=["*"] per the CORS spec.
 # JWT is sent via Authorization header (not cookies), so credentials flag is not needed.
 _cors_origins = os.getenv("ALLOWED_ORIGINS", "*").split(",")
@@ -69,6 +107,34 @@ async def health():
     return {"status": "ok"}
 
 
+@app.get("/ready")
+async def ready():
+    """Readiness for kiosk traffic — 503 until the face models are loaded and warmed up."""
+    is_ready = model_registry.is_ready()
+    content = {
+        "status": "ready" if is_ready else "starting",
+        "model_load_mode": MODEL_LOAD_MODE,
+        "face_backend": FACE_BACKEND,
+        "model_error": model_registry.error,
+        "timings": {**startup_timings, **model_registry.timings},
+    }
+    return JSONResponse(status_code=200 if is_ready else 503, content=content)
+
+
+@app.get("/metrics")
+async def metrics(_admin: dict = Depends(get_current_admin)):
+    """Operational counters; admin-only, since they reveal traffic and integration health."""
+    return {
+        "inference_pending": inference_executor.pending,
+        "liveness": get_liveness_metrics(),
+        "local_liveness": dict(local_liveness.decision_counts),
+        "capture_uploads": capture_uploader.metrics(),
+        "email_outbox": outbox_sender.metrics(),
+        "websocket": ws_manager.metrics(),
+        "response_cache": response_cache.metrics(),
+    }
+
+
 @app.get("/")
 async def root():
     return {"message": "Face Attendance System API"}
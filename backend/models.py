@@ -1,5 +1,5 @@
 from datetime import datetime, date
-from sqlalchemy import Column, Integer, Text, DateTime, Date, ForeignKey
+from sqlalchemy import Column, Integer, Text, DateTime, Date, ForeignKey, LargeBinary, Index
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -31,8 +31,11 @@ class FaceEmbedding(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     trainee_id = Column(Integer, ForeignKey("trainees.id", ondelete="CASCADE"), nullable=False)
-    embedding = Column(Text, nullable=False)
+    # 8-byte header + little-endian float32 values, see services.embedding_codec
+    embedding = Column(LargeBinary, nullable=False)
     source = Column(Text, default="camera")
+    # Registration pose this template was captured in; "average" for legacy averaged rows
+    pose = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
     trainee = relationship("Trainee", back_populates="embeddings", lazy="select")
@@ -52,6 +55,21 @@ class Attendance(Base):
 
     trainee = relationship("Trainee", back_populates="attendance_records", lazy="select")
 
+    __table_args__ = (
+        # One row per trainee per day; check-in/check-out upsert against it
+        Index("uq_attendance_trainee_date", "trainee_id", "date", unique=True),
+    )
+
+
+# Keyset pagination order for the history endpoints (attendance_service._HISTORY_ORDER).
+# SQLite rejects NULLS LAST in an index, but its DESC already puts NULLs last.
+Index(
+    "ix_attendance_history", Attendance.date.desc(), Attendance.checkin_time.desc().nulls_last(), Attendance.id.desc(),
+).ddl_if(dialect="postgresql")
+Index(
+    "ix_attendance_history", Attendance.date.desc(), Attendance.checkin_time.desc(), Attendance.id.desc(),
+).ddl_if(dialect="sqlite")
+
 
 class Setting(Base):
     __tablename__ = "settings"
@@ -59,3 +77,62 @@ class Setting(Base):
     id = Column(Integer, primary_key=True, index=True)
     key = Column(Text, unique=True, nullable=False)
     value = Column(Text, nullable=False)
+
+
+class DataVersion(Base):
+    """Change counter per entity, bumped in the same transaction as the write it describes."""
+    __tablename__ = "data_versions"
+
+    entity = Column(Text, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class EmailOutbox(Base):
+    """Emails waiting to be sent, written in the same transaction as the change they report."""
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    recipient = Column(Text, nullable=False)
+    subject = Column(Text, nullable=False)
+    body = Column(Text, nullable=False)
+    # "pending" until sent (the row is then deleted); "failed" after EMAIL_OUTBOX_MAX_ATTEMPTS
+    status = Column(Text, nullable=False, default="pending", index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class ReportJob(Base):
+    """A background export; finished artifacts are reused while the data version is unchanged."""
+    __tablename__ = "report_jobs"
+
+    id = Column(Text, primary_key=True)
+    format = Column(Text, nullable=False)
+    from_date = Column(Date, nullable=False)
+    to_date = Column(Date, nullable=False)
+    # Attendance and trainee data versions the report was rendered from
+    data_version = Column(Text, nullable=False)
+    # queued → running → done | failed
+    status = Column(Text, nullable=False, default="queued")
+    rows_total = Column(Integer, nullable=True)
+    rows_done = Column(Integer, nullable=False, default=0)
+    artifact_path = Column(Text, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_report_jobs_lookup", "format", "from_date", "to_date", "data_version"),
+    )
+
+
+class DailySummary(Base):
+    """Per-day attendance totals, adjusted in the same transaction as each attendance write."""
+    __tablename__ = "daily_summaries"
+
+    date = Column(Date, primary_key=True)
+    # Counts of attendance rows with a check-in, by status
+    present = Column(Integer, nullable=False, default=0)
+    late = Column(Integer, nullable=False, default=0)
+    checked_in = Column(Integer, nullable=False, default=0)
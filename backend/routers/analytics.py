@@ -1,35 +1,72 @@
 from datetime import date, timedelta
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import SessionLocal
-from models import Attendance, Trainee
+from core.data_version import ATTENDANCE_ENTITY, TRAINEES_ENTITY
+from core.http_cache import cached_json
+from database import get_async_db
+from dependencies import get_current_admin
+from schemas import APIResponse
+from services.analytics_service import attendance_summary, punctuality
 
 router = APIRouter(prefix="/api/v1/analytics", tags=["analytics"])
 
+# Absent counts depend on the number of trainees
+_READS = (ATTENDANCE_ENTITY, TRAINEES_ENTITY)
+
 
 @router.get("/weekly")
-def weekly_analytics():
+async def weekly_analytics(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Return attendance stats for the last 7 days for dashboard charts."""
-    db = SessionLocal()
-    try:
-        today = date.today()
-        days = []
-        for i in range(6, -1, -1):
-            d = today - timedelta(days=i)
-            records = db.query(Attendance).filter(Attendance.date == d).all()
-            total_trainees = db.query(Trainee).count()
-            present = sum(1 for r in records if r.status == "present")
-            late = sum(1 for r in records if r.status == "late")
-            absent = max(total_trainees - present - late, 0)
-            days.append({
-                "date": d.isoformat(),
-                "label": d.strftime("%a"),
-                "present": present,
-                "late": late,
-                "absent": absent,
-                "total": total_trainees,
-            })
-        return {"success": True, "data": days}
-    finally:
-        db.close()
+    today = date.today()
+
+    async def build() -> dict:
+        return {"success": True, "data": await db.run_sync(attendance_summary, today - timedelta(days=6), today)}
+
+    return await cached_json(request, db, _READS, build)
+
+
+@router.get("/summary", response_model=APIResponse)
+async def summary_analytics(
+    request: Request,
+    granularity: str = Query("day", pattern="^(day|week|month)$"),
+    from_date: date | None = Query(None, alias="from"),
+    to_date: date | None = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_async_db),
+    _admin: dict = Depends(get_current_admin),
+):
+    """Present/late/absent totals per day, week or month; defaults to the last 30 days."""
+    to_date = to_date or date.today()
+    from_date = from_date or to_date - timedelta(days=29)
+
+    async def build() -> APIResponse:
+        try:
+            data = await db.run_sync(attendance_summary, from_date, to_date, granularity)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return APIResponse(success=True, data=data)
+
+    return await cached_json(request, db, _READS, build)
+
+
+@router.get("/punctuality", response_model=APIResponse)
+async def punctuality_analytics(
+    request: Request,
+    from_date: date | None = Query(None, alias="from"),
+    to_date: date | None = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_async_db),
+    _admin: dict = Depends(get_current_admin),
+):
+    """Per-trainee on-time rate; defaults to the last 30 days."""
+    to_date = to_date or date.today()
+    from_date = from_date or to_date - timedelta(days=29)
+
+    async def build() -> APIResponse:
+        try:
+            data = await db.run_sync(punctuality, from_date, to_date)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return APIResponse(success=True, data=data)
+
+    return await cached_json(request, db, _READS, build)
@@ -3,42 +3,50 @@ import logging
 import uuid
 from datetime import datetime, date, timedelta
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import FileResponse, RedirectResponse
 from slowapi.errors import RateLimitExceeded
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from core.limiter import limiter
 
 logger = logging.getLogger(__name__)
 
-from database import get_db
-from models import Trainee, Attendance, Setting
-from schemas import AttendanceFrameRequest, AttendanceOut, AttendancePatch, APIResponse
+from database import get_async_db
+from models import Trainee, Attendance
+from schemas import AttendanceFrameRequest, AttendancePatch, APIResponse, PagedResponse
 from dependencies import get_current_admin
-from services.face_service import get_embedding, find_best_match
-from services.liveness_service import check_liveness
-from services.notification_service import send_email
-from services.storage_service import upload_capture, get_capture_url
+from services.analytics_service import adjust_daily_summary
+from services.face_service import match_face
+from services.attendance_service import (
+    ATTENDANCE_MAX_PAGE_SIZE,
+    ATTENDANCE_PAGE_SIZE,
+    ScanOutcome,
+    attendance_page,
+    record_checkout,
+    record_scan,
+)
+from services.email_outbox import outbox_sender
+from services.notification_service import enqueue_email
+from services.scan_pipeline import ScanRejected, scan_frame
+from services.settings_service import AppSettings, get_app_settings
+from services.storage_service import capture_uploader, is_capture_filename, public_capture_url, spooled_path
+from services.ticket_service import issue_ticket, redeem_ticket
+from core.data_version import ATTENDANCE_ENTITY, TRAINEES_ENTITY, bump
+from core.http_cache import cached_json
 from core.ws_manager import manager
 
 router = APIRouter(prefix="/api/v1/attendance", tags=["attendance"])
 
 
-def save_capture(frame_b64: str) -> str:
-    filename = f"{uuid.uuid4().hex}.jpg"
-    image_bytes = base64.b64decode(frame_b64)
-    upload_capture(filename, image_bytes)
-    return filename
-
-
-def get_work_start_time(db: Session) -> str:
-    setting = db.query(Setting).filter(Setting.key == "work_start_time").first()
-    return setting.value if setting else "09:00"
+def new_capture_filename() -> str:
+    return f"{uuid.uuid4().hex}.jpg"
 
 
-def is_liveness_enabled(db: Session) -> bool:
-    setting = db.query(Setting).filter(Setting.key == "liveness_check_enabled").first()
-    if setting is None:
-        return True
-    return setting.value.lower() == "true"
+def save_capture(frame_b64: str, filename: str) -> None:
+    image_bytes = base64.b64decode(frame_b64)
+    # Spooled locally; R2 latency and outages stay off the kiosk's critical path
+    capture_uploader.spool(filename, image_bytes)
 
 
 def compute_status(checkin_time: datetime, work_start: str, grace_minutes: int = 10) -> str:
@@ -50,28 +58,47 @@ def compute_status(checkin_time: datetime, work_start: str, grace_minutes: int =
     return "late"
 
 
-@router.post("/identify", response_model=APIResponse)
-@limiter.limit("1 per 10 seconds")
-async def identify(request: Request, body: AttendanceFrameRequest, db: Session = Depends(get_db)):
-    if is_liveness_enabled(db):
-        is_live = await check_liveness(body.frame)
-        if not is_live:
-            raise HTTPException(status_code=400, detail="Liveness check failed. Please look at the camera naturally.")
-
+async def _scan_frame(
+    frame: str, db: AsyncSession, settings: AppSettings, check_live: bool
+) -> tuple[Trainee, float, bool | None]:
     try:
-        new_embedding = await get_embedding(body.frame)
-    except ValueError as e:
+        scan = await scan_frame(frame, check_live)
+    except ScanRejected as e:
         raise HTTPException(status_code=400, detail=str(e))
-    trainee = find_best_match(new_embedding, db)
+    trainee, score = await db.run_sync(lambda s: match_face(scan.embedding, s, settings.similarity_threshold))
 
     if not trainee:
         raise HTTPException(status_code=400, detail="Face not recognized. Try again.")
+    return trainee, score, scan.is_live
+
+
+async def _resolve_trainee(
+    body: AttendanceFrameRequest, db: AsyncSession, settings: AppSettings, check_live: bool
+) -> Trainee:
+    """Identify the trainee for a recording request, reusing the /identify ticket when it is valid."""
+    if body.ticket:
+        ticket = redeem_ticket(body.ticket, body.frame)
+        # A ticket issued while liveness was off can't vouch for the frame once it is on
+        if ticket and (ticket.is_live or not check_live):
+            trainee = await db.get(Trainee, ticket.trainee_id)
+            if trainee:
+                return trainee
+
+    trainee, _, _ = await _scan_frame(body.frame, db, settings, check_live)
+    return trainee
+
+
+@router.post("/identify", response_model=APIResponse)
+@limiter.limit("1 per 10 seconds")
+async def identify(request: Request, body: AttendanceFrameRequest, db: AsyncSession = Depends(get_async_db)):
+    settings = await db.run_sync(get_app_settings)
+    trainee, score, is_live = await _scan_frame(body.frame, db, settings, settings.liveness_check_enabled)
 
     today = date.today()
-    existing = db.query(Attendance).filter(
+    existing = await db.scalar(select(Attendance).where(
         Attendance.trainee_id == trainee.id,
         Attendance.date == today,
-    ).first()
+    ))
 
     if existing and existing.checkin_time and existing.checkout_time:
         raise HTTPException(status_code=400, detail=f"{trainee.unique_name} already checked in and out today.")
@@ -84,6 +111,8 @@ async def identify(request: Request, body: AttendanceFrameRequest, db: Session =
             "trainee_id": trainee.id,
             "trainee_name": trainee.unique_name,
             "action": action,
+            # Lets /checkin or /checkout record this scan without repeating liveness + matching
+            "ticket": issue_ticket(trainee.id, score, is_live, body.frame),
         },
         message=f"Identified as {trainee.unique_name}",
     )
@@ -91,200 +120,131 @@ async def identify(request: Request, body: AttendanceFrameRequest, db: Session =
 
 @router.post("/checkin", response_model=APIResponse)
 @limiter.limit("1 per 10 seconds")
-async def checkin(request: Request, body: AttendanceFrameRequest, db: Session = Depends(get_db)):
-    if is_liveness_enabled(db):
-        is_live = await check_liveness(body.frame)
-        if not is_live:
-            raise HTTPException(status_code=400, detail="Liveness check failed. Please look at the camera naturally.")
+async def checkin(request: Request, body: AttendanceFrameRequest, db: AsyncSession = Depends(get_async_db)):
+    settings = await db.run_sync(get_app_settings)
+    trainee = await _resolve_trainee(body, db, settings, settings.liveness_check_enabled)
 
-    try:
-        new_embedding = await get_embedding(body.frame)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    trainee = find_best_match(new_embedding, db)
+    now = datetime.now()
+    image = new_capture_filename()
+    status = compute_status(now, settings.work_start_time, settings.grace_period_minutes)
+    outcome = await db.run_sync(record_scan, trainee.id, now.date(), now, image, status)
+    if outcome is None:
+        raise HTTPException(status_code=400, detail="Already checked in and out today.")
+    return await _finish_scan(db, trainee, outcome, body.frame, image)
 
-    if not trainee:
-        raise HTTPException(status_code=400, detail="Face not recognized. Try again.")
 
-    today = date.today()
-    existing = db.query(Attendance).filter(
-        Attendance.trainee_id == trainee.id,
-        Attendance.date == today,
-    ).first()
+@router.post("/checkout", response_model=APIResponse)
+@limiter.limit("1 per 10 seconds")
+async def checkout(request: Request, body: AttendanceFrameRequest, db: AsyncSession = Depends(get_async_db)):
+    trainee = await _resolve_trainee(body, db, await db.run_sync(get_app_settings), check_live=True)
 
-    if existing and existing.checkin_time and existing.checkout_time:
-        raise HTTPException(status_code=400, detail="Already checked in and out today.")
+    now = datetime.now()
+    image = new_capture_filename()
+    outcome = await db.run_sync(record_checkout, trainee.id, now.date(), now, image)
+    if outcome is None:
+        existing = await db.scalar(select(Attendance).where(
+            Attendance.trainee_id == trainee.id,
+            Attendance.date == now.date(),
+        ))
+        if not existing or not existing.checkin_time:
+            raise HTTPException(status_code=400, detail=f"{trainee.unique_name} has not checked in today.")
+        raise HTTPException(status_code=400, detail=f"{trainee.unique_name} already checked out today.")
+    return await _finish_scan(db, trainee, outcome, body.frame, image)
 
-    if existing and existing.checkin_time and not existing.checkout_time:
-        existing.checkout_time = datetime.now()
-        existing.checkout_image = save_capture(body.frame)
-        db.commit()
-        db.refresh(existing)
-        _send_attendance_email(trainee, "checkout", existing.checkout_time, existing.checkout_image)
-        await manager.broadcast({
-            "type": "checkout",
-            "trainee_name": trainee.unique_name,
-            "time": existing.checkout_time.strftime("%I:%M %p"),
-            "status": existing.status,
-        })
-        return APIResponse(
-            success=True,
-            data={
-                "trainee_name": trainee.unique_name,
-                "time": existing.checkout_time.strftime("%I:%M %p"),
-                "status": existing.status,
-                "action": "checkout",
-            },
-            message=f"Checkout recorded for {trainee.unique_name}",
-        )
 
-    now = datetime.now()
-    work_start = get_work_start_time(db)
-    grace_setting = db.query(Setting).filter(Setting.key == "grace_period_minutes").first()
-    grace_minutes = int(grace_setting.value) if grace_setting else 10
-    status = compute_status(now, work_start, grace_minutes)
-
-    record = Attendance(
-        trainee_id=trainee.id,
-        date=today,
-        checkin_time=now,
-        checkin_image=save_capture(body.frame),
-        status=status,
-    )
-    db.add(record)
-    db.commit()
-    db.refresh(record)
+async def _finish_scan(db: AsyncSession, trainee: Trainee, outcome: ScanOutcome, frame: str, image: str) -> APIResponse:
+    """Queue the email and commit, then spool the capture and notify dashboards."""
+    time = outcome.checkin_time if outcome.action == "checkin" else outcome.checkout_time
+    await db.run_sync(_queue_attendance_email, trainee, outcome.action, time, image)
+    await db.commit()
+    # Only after the commit, so a rolled-back scan never uploads an orphan capture
+    try:
+        save_capture(frame, image)
+    except OSError:
+        logger.exception("Could not spool capture %s", image)
+    outbox_sender.wake()
 
-    _send_attendance_email(trainee, "checkin", record.checkin_time, record.checkin_image)
-    await manager.broadcast({
-        "type": "checkin",
+    manager.broadcast({
+        "type": outcome.action,
         "trainee_name": trainee.unique_name,
-        "time": record.checkin_time.strftime("%I:%M %p"),
-        "status": status,
+        "time": time.strftime("%I:%M %p"),
+        "status": outcome.status,
     })
-
+    label = "Check-in" if outcome.action == "checkin" else "Checkout"
     return APIResponse(
         success=True,
         data={
             "trainee_name": trainee.unique_name,
-            "time": record.checkin_time.strftime("%I:%M %p"),
-            "status": status,
-            "action": "checkin",
+            "time": time.strftime("%I:%M %p"),
+            "status": outcome.status,
+            "action": outcome.action,
         },
-        message=f"Check-in recorded for {trainee.unique_name}",
+        message=f"{label} recorded for {trainee.unique_name}",
     )
 
 
-@router.post("/checkout", response_model=APIResponse)
-@limiter.limit("1 per 10 seconds")
-async def checkout(request: Request, body: AttendanceFrameRequest, db: Session = Depends(get_db)):
-    is_live = await check_liveness(body.frame)
-    if not is_live:
-        raise HTTPException(status_code=400, detail="Liveness check failed. Please look at the camera naturally.")
+@router.get("/captures/{filename}")
+async def get_spooled_capture(filename: str):
+    """Serve a capture that is still waiting in the local upload spool."""
+    path = spooled_path(filename)
+    if path is None:
+        if is_capture_filename(filename):
+            return RedirectResponse(public_capture_url(filename))
+        raise HTTPException(status_code=404, detail="Capture not found")
+    return FileResponse(path, media_type="image/jpeg")
 
-    try:
-        new_embedding = await get_embedding(body.frame)
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    trainee = find_best_match(new_embedding, db)
-
-    if not trainee:
-        raise HTTPException(status_code=400, detail="Face not recognized. Try again.")
-
-    today = date.today()
-    existing = db.query(Attendance).filter(
-        Attendance.trainee_id == trainee.id,
-        Attendance.date == today,
-    ).first()
-
-    if not existing or not existing.checkin_time:
-        raise HTTPException(status_code=400, detail=f"{trainee.unique_name} has not checked in today.")
-
-    if existing.checkout_time:
-        raise HTTPException(status_code=400, detail=f"{trainee.unique_name} already checked out today.")
 
-    existing.checkout_time = datetime.now()
-    existing.checkout_image = save_capture(body.frame)
-    db.commit()
-    db.refresh(existing)
+# Attendance rows are listed with trainee names
+_LIST_READS = (ATTENDANCE_ENTITY, TRAINEES_ENTITY)
 
-    _send_attendance_email(trainee, "checkout", existing.checkout_time, existing.checkout_image)
-    await manager.broadcast({
-        "type": "checkout",
-        "trainee_name": trainee.unique_name,
-        "time": existing.checkout_time.strftime("%I:%M %p"),
-        "status": existing.status,
-    })
-
-    return APIResponse(
-        success=True,
-        data={
-            "trainee_name": trainee.unique_name,
-            "time": existing.checkout_time.strftime("%I:%M %p"),
-            "status": existing.status,
-            "action": "checkout",
-        },
-        message=f"Checkout recorded for {trainee.unique_name}",
-    )
 
-
-@router.get("", response_model=APIResponse)
+@router.get("", response_model=PagedResponse)
 async def get_attendance(
+    request: Request,
     date_filter: date | None = Query(None, alias="date"),
     trainee_id: int | None = None,
     from_date: date | None = Query(None, alias="from"),
     to_date: date | None = Query(None, alias="to"),
-    db: Session = Depends(get_db),
+    cursor: str | None = None,
+    limit: int = Query(ATTENDANCE_PAGE_SIZE, ge=1, le=ATTENDANCE_MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
     _admin: dict = Depends(get_current_admin),
 ):
-    query = db.query(Attendance)
-
+    filters = []
     if date_filter:
-        query = query.filter(Attendance.date == date_filter)
+        filters.append(Attendance.date == date_filter)
     if trainee_id:
-        query = query.filter(Attendance.trainee_id == trainee_id)
+        filters.append(Attendance.trainee_id == trainee_id)
     if from_date:
-        query = query.filter(Attendance.date >= from_date)
+        filters.append(Attendance.date >= from_date)
     if to_date:
-        query = query.filter(Attendance.date <= to_date)
-
-    records = query.order_by(Attendance.date.desc(), Attendance.checkin_time.desc()).all()
-
-    trainee_ids = {r.trainee_id for r in records}
-    trainee_map = {
-        t.id: t.unique_name
-        for t in db.query(Trainee).filter(Trainee.id.in_(trainee_ids)).all()
-    }
-
-    data = []
-    for r in records:
-        item = AttendanceOut(
-            id=r.id,
-            trainee_id=r.trainee_id,
-            trainee_name=trainee_map.get(r.trainee_id, "Unknown"),
-            date=r.date,
-            checkin_time=r.checkin_time,
-            checkout_time=r.checkout_time,
-            checkin_image=get_capture_url(r.checkin_image) if r.checkin_image else None,
-            checkout_image=get_capture_url(r.checkout_image) if r.checkout_image else None,
-            status=r.status,
-        )
-        data.append(item.model_dump())
-
-    return APIResponse(success=True, data=data, message="Attendance records retrieved")
+        filters.append(Attendance.date <= to_date)
+
+    return await cached_json(request, db, _LIST_READS, lambda: db.run_sync(_paged_attendance, filters, cursor, limit))
+
+
+def _paged_attendance(db: Session, filters: list, cursor: str | None, limit: int) -> PagedResponse:
+    try:
+        data, next_cursor = attendance_page(db, filters, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return PagedResponse(success=True, data=data, next_cursor=next_cursor, message="Attendance records retrieved")
 
 
 @router.patch("/{record_id}", response_model=APIResponse)
 async def patch_attendance(
     record_id: int,
     body: AttendancePatch,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     _admin: dict = Depends(get_current_admin),
 ):
-    record = db.query(Attendance).filter(Attendance.id == record_id).first()
+    record = await db.get(Attendance, record_id)
     if not record:
         raise HTTPException(status_code=404, detail="Attendance record not found")
 
+    counted_before = record.checkin_time is not None
+    status_before = record.status
+
     if body.checkin_time is not None:
         record.checkin_time = body.checkin_time
     if body.checkout_time is not None:
@@ -292,13 +252,16 @@ async def patch_attendance(
     if body.status is not None:
         record.status = body.status
     elif body.checkin_time is not None:
-        work_start = get_work_start_time(db)
-        grace_setting = db.query(Setting).filter(Setting.key == "grace_period_minutes").first()
-        grace_minutes = int(grace_setting.value) if grace_setting else 10
-        record.status = compute_status(body.checkin_time, work_start, grace_minutes)
+        settings = await db.run_sync(get_app_settings)
+        record.status = compute_status(body.checkin_time, settings.work_start_time, settings.grace_period_minutes)
 
-    db.commit()
-    db.refresh(record)
+    if (counted_before, status_before) != (record.checkin_time is not None, record.status):
+        if counted_before:
+            await db.run_sync(adjust_daily_summary, record.date, status_before, -1)
+        if record.checkin_time is not None:
+            await db.run_sync(adjust_daily_summary, record.date, record.status)
+    await db.run_sync(bump, ATTENDANCE_ENTITY)
+    await db.commit()
 
     return APIResponse(success=True, message="Attendance record updated")
 
@@ -306,97 +269,78 @@ async def patch_attendance(
 @router.delete("/{record_id}", response_model=APIResponse)
 async def delete_attendance(
     record_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     _admin: dict = Depends(get_current_admin),
 ):
-    record = db.query(Attendance).filter(Attendance.id == record_id).first()
+    record = await db.get(Attendance, record_id)
     if not record:
         raise HTTPException(status_code=404, detail="Attendance record not found")
 
-    db.delete(record)
-    db.commit()
+    if record.checkin_time is not None:
+        await db.run_sync(adjust_daily_summary, record.date, record.status, -1)
+    await db.delete(record)
+    await db.run_sync(bump, ATTENDANCE_ENTITY)
+    await db.commit()
 
     return APIResponse(success=True, message="Attendance record deleted")
 
 
-@router.get("/my", response_model=APIResponse)
+@router.get("/my", response_model=PagedResponse)
 async def get_my_attendance(
+    request: Request,
     name: str = Query(...),
     from_date: date | None = Query(None, alias="from"),
     to_date: date | None = Query(None, alias="to"),
-    db: Session = Depends(get_db),
+    cursor: str | None = None,
+    limit: int = Query(ATTENDANCE_PAGE_SIZE, ge=1, le=ATTENDANCE_MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    trainee = db.query(Trainee).filter(Trainee.unique_name == name).first()
-    if not trainee:
-        raise HTTPException(status_code=404, detail="Trainee not found")
-
-    query = db.query(Attendance).filter(Attendance.trainee_id == trainee.id)
-    if from_date:
-        query = query.filter(Attendance.date >= from_date)
-    if to_date:
-        query = query.filter(Attendance.date <= to_date)
-
-    records = query.order_by(Attendance.date.desc(), Attendance.checkin_time.desc()).all()
+    async def build() -> PagedResponse:
+        trainee_id = await db.scalar(select(Trainee.id).where(Trainee.unique_name == name))
+        if trainee_id is None:
+            raise HTTPException(status_code=404, detail="Trainee not found")
 
-    data = []
-    for r in records:
-        item = AttendanceOut(
-            id=r.id,
-            trainee_id=r.trainee_id,
-            trainee_name=trainee.unique_name,
-            date=r.date,
-            checkin_time=r.checkin_time,
-            checkout_time=r.checkout_time,
-            checkin_image=get_capture_url(r.checkin_image) if r.checkin_image else None,
-            checkout_image=get_capture_url(r.checkout_image) if r.checkout_image else None,
-            status=r.status,
-        )
-        data.append(item.model_dump())
+        filters = [Attendance.trainee_id == trainee_id]
+        if from_date:
+            filters.append(Attendance.date >= from_date)
+        if to_date:
+            filters.append(Attendance.date <= to_date)
+        return await db.run_sync(_paged_attendance, filters, cursor, limit)
 
-    return APIResponse(success=True, data=data, message="Attendance records retrieved")
+    return await cached_json(request, db, _LIST_READS, build)
 
 
-@router.get("/history", response_model=APIResponse)
+@router.get("/history", response_model=PagedResponse)
 async def get_public_history(
+    request: Request,
     name: str | None = Query(None),
     from_date: date | None = Query(None, alias="from"),
     to_date: date | None = Query(None, alias="to"),
-    db: Session = Depends(get_db),
+    cursor: str | None = None,
+    limit: int = Query(ATTENDANCE_PAGE_SIZE, ge=1, le=ATTENDANCE_MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Public endpoint for the history page — optionally filter by trainee name."""
-    query = db.query(Attendance)
-    if name:
-        trainee = db.query(Trainee).filter(Trainee.unique_name == name).first()
-        if not trainee:
-            raise HTTPException(status_code=404, detail="Trainee not found")
-        query = query.filter(Attendance.trainee_id == trainee.id)
-    if from_date:
-        query = query.filter(Attendance.date >= from_date)
-    if to_date:
-        query = query.filter(Attendance.date <= to_date)
-
-    records = query.order_by(Attendance.date.desc(), Attendance.checkin_time.desc()).all()
-
-    data = []
-    for r in records:
-        t = db.query(Trainee).filter(Trainee.id == r.trainee_id).first()
-        item = AttendanceOut(
-            id=r.id,
-            trainee_id=r.trainee_id,
-            trainee_name=t.unique_name if t else "Unknown",
-            date=r.date,
-            checkin_time=r.checkin_time,
-            checkout_time=r.checkout_time,
-            checkin_image=get_capture_url(r.checkin_image) if r.checkin_image else None,
-            checkout_image=get_capture_url(r.checkout_image) if r.checkout_image else None,
-            status=r.status,
-        )
-        data.append(item.model_dump())
-
-    return APIResponse(success=True, data=data, message="Attendance records retrieved")
-
-
-def _send_attendance_email(trainee: Trainee, action: str, time: datetime, image_filename: str | None = None) -> None:
+    async def build() -> PagedResponse:
+        filters = []
+        if name:
+            trainee_id = await db.scalar(select(Trainee.id).where(Trainee.unique_name == name))
+            if trainee_id is None:
+                raise HTTPException(status_code=404, detail="Trainee not found")
+            filters.append(Attendance.trainee_id == trainee_id)
+        if from_date:
+            filters.append(Attendance.date >= from_date)
+        if to_date:
+            filters.append(Attendance.date <= to_date)
+        return await db.run_sync(_paged_attendance, filters, cursor, limit)
+
+    return await cached_json(request, db, _LIST_READS, build)
+
+
+def _queue_attendance_email(
+    db: Session, trainee: Trainee, action: str, time: datetime, image_filename: str | None = None
+) -> None:
+    """Add the confirmation email to the outbox as part of the attendance transaction."""
     if not trainee.email:
         return
     action_label = "Check-in" if action == "checkin" else "Check-out"
@@ -406,7 +350,8 @@ def _send_attendance_email(trainee: Trainee, action: str, time: datetime, image_
 
     image_tag = ""
     if image_filename:
-        image_url = get_capture_url(image_filename)
+        # The spool URL is only reachable from the admin UI, and the upload finishes long before the mail is read
+        image_url = public_capture_url(image_filename)
         image_tag = f'<br><img src="{image_url}" style="max-width:320px;border-radius:12px;border:2px solid #e5e7eb;margin-top:12px;">'
 
     body = f"""
@@ -432,8 +377,4 @@ def _send_attendance_email(trainee: Trainee, action: str, time: datetime, image_
       </div>
     </div>
     """
-    try:
-        send_email(trainee.email, f"ScanIn {action_label} — {time_str}", body)
-        logger.info("Sent %s email to %s", action, trainee.email)
-    except Exception as e:
-        logger.error("Failed to send %s email to %s: %s", action, trainee.email, e)
+    enqueue_email(db, trainee.email, f"ScanIn {action_label} — {time_str}", body)
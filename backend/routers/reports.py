@@ -1,151 +1,136 @@
+import csv
 import io
+import os
+import tempfile
 from datetime import date, timedelta
-from fastapi import APIRouter, Depends, Query
-from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from typing import Iterator
 
-from database import get_db
-from models import Attendance, Trainee
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import SessionLocal, get_async_db
+from models import ReportJob
+from schemas import APIResponse, ReportJobRequest
 from dependencies import get_current_admin
+from services.report_jobs import job_view, report_jobs
+from services.report_service import (
+    EXPORT_CHUNK_ROWS, FORMATS, HEADERS, iter_attendance_rows, render_report, report_filename,
+)
 
 router = APIRouter(prefix="/api/v1/reports", tags=["reports"])
 
 
-def get_attendance_data(db: Session, from_date: date, to_date: date) -> list[dict]:
-    records = (
-        db.query(Attendance)
-        .filter(Attendance.date >= from_date, Attendance.date <= to_date)
-        .order_by(Attendance.date.asc(), Attendance.checkin_time.asc())
-        .all()
-    )
-
-    trainee_ids = {r.trainee_id for r in records}
-    trainee_map = {
-        t.id: t.unique_name
-        for t in db.query(Trainee).filter(Trainee.id.in_(trainee_ids)).all()
-    }
-
-    rows = []
-    for r in records:
-        rows.append({
-            "Date": str(r.date),
-            "Name": trainee_map.get(r.trainee_id, "Unknown"),
-            "Check-in": r.checkin_time.strftime("%H:%M:%S") if r.checkin_time else "",
-            "Check-out": r.checkout_time.strftime("%H:%M:%S") if r.checkout_time else "",
-            "Status": r.status or "",
-        })
-    return rows
+def _default_range(from_date: date | None, to_date: date | None) -> tuple[date, date]:
+    if not from_date:
+        from_date = date.today() - timedelta(days=date.today().weekday())
+    if not to_date:
+        to_date = date.today()
+    return from_date, to_date
 
 
 @router.get("/export")
 async def export_report(
-    format: str = Query("excel", pattern="^(excel|pdf)$"),
+    format: str = Query("excel", pattern="^(excel|csv|pdf)$"),
     from_date: date = Query(None, alias="from"),
     to_date: date = Query(None, alias="to"),
-    db: Session = Depends(get_db),
     _admin: dict = Depends(get_current_admin),
 ):
-    if not from_date:
-        from_date = date.today() - timedelta(days=date.today().weekday())
-    if not to_date:
-        to_date = date.today()
-
-    rows = get_attendance_data(db, from_date, to_date)
-
-    if format == "excel":
-        return generate_excel(rows, from_date, to_date)
-    return generate_pdf(rows, from_date, to_date)
-
-
-def generate_excel(rows: list[dict], from_date: date, to_date: date) -> StreamingResponse:
-    from openpyxl import Workbook
-    from openpyxl.styles import Font
-    from openpyxl.utils import get_column_letter
-
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Attendance Report"
-
-    headers = ["Name", "Date", "Check-in", "Check-out", "Status"]
-    ws.append(headers)
-    bold = Font(bold=True)
-    for col_idx in range(1, len(headers) + 1):
-        ws.cell(row=1, column=col_idx).font = bold
-
-    for row in rows:
-        ws.append([row[h] for h in headers])
-
-    for col_idx in range(1, len(headers) + 1):
-        max_len = max(
-            len(str(ws.cell(row=r, column=col_idx).value or ""))
-            for r in range(1, ws.max_row + 1)
-        )
-        ws.column_dimensions[get_column_letter(col_idx)].width = max_len + 3
-
-    buffer = io.BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-
-    fn = f"attendance_{from_date.strftime('%Y%m%d')}_{to_date.strftime('%Y%m%d')}.xlsx"
+    """Render and download in one request. Fine for short ranges; use /jobs for long ones.
+
+    CSV streams row chunks as they are read, so the first byte arrives quickly.
+    Excel and PDF can't be written front to back: the whole file is rendered
+    before the first byte is sent.
+    """
+    from_date, to_date = _default_range(from_date, to_date)
+    body = _stream_csv(from_date, to_date) if format == "csv" else _stream_rendered(format, from_date, to_date)
     return StreamingResponse(
-        buffer,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={fn}"},
+        body,
+        media_type=FORMATS[format][1],
+        headers={"Content-Disposition": f"attachment; filename={report_filename(format, from_date, to_date)}"},
     )
 
 
-def generate_pdf(rows: list[dict], from_date: date, to_date: date) -> StreamingResponse:
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib import colors
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet
-
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    styles = getSampleStyleSheet()
-    elements = []
-
-    elements.append(Paragraph(f"Attendance Report: {from_date} to {to_date}", styles["Title"]))
-    elements.append(Spacer(1, 20))
-
-    headers = ["Name", "Date", "Check-in", "Check-out", "Status"]
-    if rows:
-        table_data = [headers] + [[row[h] for h in headers] for row in rows]
-    else:
-        table_data = [headers, ["No records", "", "", "", ""]]
-
-    table = Table(table_data)
-
-    style_cmds = [
-        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1f2937")),
-        ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
-        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-        ("FONTSIZE", (0, 0), (-1, -1), 9),
-        ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
-        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#f9fafb")]),
-    ]
-
-    status_colors = {
-        "present": colors.HexColor("#dcfce7"),
-        "late": colors.HexColor("#fef9c3"),
-        "absent": colors.HexColor("#fee2e2"),
-    }
-    for i, row in enumerate(rows):
-        bg = status_colors.get(row.get("Status", "").lower())
-        if bg:
-            style_cmds.append(("BACKGROUND", (0, i + 1), (-1, i + 1), bg))
-
-    table.setStyle(TableStyle(style_cmds))
-    elements.append(table)
-
-    doc.build(elements)
-    buffer.seek(0)
-
-    fn = f"attendance_{from_date.strftime('%Y%m%d')}_{to_date.strftime('%Y%m%d')}.pdf"
-    return StreamingResponse(
-        buffer,
-        media_type="application/pdf",
-        headers={"Content-Disposition": f"attachment; filename={fn}"},
+def _stream_csv(from_date: date, to_date: date) -> Iterator[bytes]:
+    # Runs in Starlette's threadpool while the response is sent, so it needs its own session
+    db = SessionLocal()
+    try:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        # BOM so Excel opens the file as UTF-8
+        buffer.write("\ufeff")
+        writer.writerow(HEADERS)
+        for i, row in enumerate(iter_attendance_rows(db, from_date, to_date), start=1):
+            writer.writerow(row)
+            if i % EXPORT_CHUNK_ROWS == 0:
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode()
+    finally:
+        db.close()
+
+
+def _stream_rendered(format: str, from_date: date, to_date: date) -> Iterator[bytes]:
+    # xlsx and pdf can't be emitted front to back, so render to a temp file, then stream that
+    fd, path = tempfile.mkstemp(suffix=f".{FORMATS[format][0]}")
+    os.close(fd)
+    db = SessionLocal()
+    try:
+        render_report(db, format, from_date, to_date, path)
+        with open(path, "rb") as f:
+            while chunk := f.read(64 * 1024):
+                yield chunk
+    finally:
+        db.close()
+        os.remove(path)
+
+
+@router.post("/jobs")
+async def submit_report_job(
+    req: ReportJobRequest,
+    db: AsyncSession = Depends(get_async_db),
+    _admin: dict = Depends(get_current_admin),
+):
+    from_date, to_date = _default_range(req.from_date, req.to_date)
+    if from_date > to_date:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    try:
+        job = await db.run_sync(report_jobs.submit, req.format, from_date, to_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return APIResponse(success=True, data=job_view(job))
+
+
+async def _get_job(db: AsyncSession, job_id: str) -> ReportJob:
+    job = await db.get(ReportJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Report job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}")
+async def get_report_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    _admin: dict = Depends(get_current_admin),
+):
+    return APIResponse(success=True, data=job_view(await _get_job(db, job_id)))
+
+
+@router.get("/jobs/{job_id}/download")
+async def download_report_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_async_db),
+    _admin: dict = Depends(get_current_admin),
+):
+    job = await _get_job(db, job_id)
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail="Report is not ready yet")
+    if not job.artifact_path or not os.path.exists(job.artifact_path):
+        raise HTTPException(status_code=410, detail="Report file has expired. Please generate it again.")
+    return FileResponse(
+        job.artifact_path,
+        media_type=FORMATS[job.format][1],
+        filename=report_filename(job.format, job.from_date, job.to_date),
     )
@@ -1,17 +1,19 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from database import get_db
+from database import get_async_db
 from models import Setting
 from schemas import SettingUpdate, SettingOut, APIResponse
 from dependencies import get_current_admin
+from services.settings_service import mark_settings_changed
 
 router = APIRouter(prefix="/api/v1/settings", tags=["settings"])
 
 
 @router.get("", response_model=APIResponse)
-async def get_settings(db: Session = Depends(get_db), _admin: dict = Depends(get_current_admin)):
-    settings = db.query(Setting).all()
+async def get_settings(db: AsyncSession = Depends(get_async_db), _admin: dict = Depends(get_current_admin)):
+    settings = (await db.scalars(select(Setting))).all()
     data = {s.key: s.value for s in settings}
     return APIResponse(success=True, data=data, message="Settings retrieved")
 
@@ -19,15 +21,17 @@ async def get_settings(db: Session = Depends(get_db), _admin: dict = Depends(get
 @router.patch("", response_model=APIResponse)
 async def update_setting(
     body: SettingUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     _admin: dict = Depends(get_current_admin),
 ):
-    setting = db.query(Setting).filter(Setting.key == body.key).first()
+    setting = await db.scalar(select(Setting).where(Setting.key == body.key))
     if not setting:
         setting = Setting(key=body.key, value=body.value)
         db.add(setting)
     else:
         setting.value = body.value
 
-    db.commit()
+    # Tells every worker's settings cache to reload
+    await db.run_sync(mark_settings_changed)
+    await db.commit()
     return APIResponse(success=True, message=f"Setting '{body.key}' updated")
@@ -1,34 +1,63 @@
-import json
 import base64
-from fastapi import APIRouter, Depends, HTTPException, Form, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Form, Request, UploadFile, File
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
-from database import get_db
+from core.data_version import ATTENDANCE_ENTITY, TRAINEES_ENTITY, bump
+from core.http_cache import cached_json
+from database import get_async_db
 from models import Trainee, FaceEmbedding, Attendance
 from schemas import TraineeSelfRegister, TraineeOut, APIResponse
 from dependencies import get_current_admin
-from services.face_service import get_embedding, average_embeddings
+from services.analytics_service import remove_trainee_from_summaries
+from services.embedding_codec import encode_embedding
+from services.face_service import get_embeddings_batch
+from services.gallery_service import gallery
 
 router = APIRouter(prefix="/api/v1/trainees", tags=["trainees"])
 
+# Guided self-registration captures these poses in this order (see RegisterPage POSES)
+REGISTRATION_POSES = ["front", "left", "right", "up", "front_again"]
+
+
+def pose_tag(frame_index: int) -> str:
+    if frame_index < len(REGISTRATION_POSES):
+        return REGISTRATION_POSES[frame_index]
+    return f"frame_{frame_index + 1}"
+
+
+def _store_templates(
+    db: Session, trainee_id: int, embeddings: list[tuple[str | None, list[float]]], source: str
+) -> list[tuple[int, list[float]]]:
+    """Store one FaceEmbedding row per template and return (row_id, embedding) pairs."""
+    faces = [
+        FaceEmbedding(trainee_id=trainee_id, embedding=encode_embedding(emb), source=source, pose=pose)
+        for pose, emb in embeddings
+    ]
+    db.add_all(faces)
+    db.flush()
+    return [(face.id, emb) for face, (_, emb) in zip(faces, embeddings)]
+
 
 @router.get("/public", response_model=APIResponse)
-async def list_trainees_public(db: Session = Depends(get_db)):
+async def list_trainees_public(request: Request, db: AsyncSession = Depends(get_async_db)):
     """Public endpoint — returns only id and unique_name for the history dropdown."""
-    trainees = db.query(Trainee.id, Trainee.unique_name).order_by(Trainee.unique_name).all()
-    data = [{"id": t.id, "unique_name": t.unique_name} for t in trainees]
-    return APIResponse(success=True, data=data, message="Trainee list retrieved")
+    async def build() -> APIResponse:
+        trainees = await db.execute(select(Trainee.id, Trainee.unique_name).order_by(Trainee.unique_name))
+        data = [{"id": t.id, "unique_name": t.unique_name} for t in trainees]
+        return APIResponse(success=True, data=data, message="Trainee list retrieved")
+
+    return await cached_json(request, db, (TRAINEES_ENTITY,), build)
 
 
 @router.get("", response_model=APIResponse)
-async def list_trainees(db: Session = Depends(get_db), _admin: dict = Depends(get_current_admin)):
-    trainees = db.query(Trainee).all()
-    embedding_counts = dict(
-        db.query(FaceEmbedding.trainee_id, func.count(FaceEmbedding.id))
+async def list_trainees(db: AsyncSession = Depends(get_async_db), _admin: dict = Depends(get_current_admin)):
+    trainees = (await db.scalars(select(Trainee))).all()
+    embedding_counts = dict((await db.execute(
+        select(FaceEmbedding.trainee_id, func.count(FaceEmbedding.id))
         .group_by(FaceEmbedding.trainee_id)
-        .all()
-    )
+    )).all())
     data = []
     for t in trainees:
         item = TraineeOut.model_validate(t).model_dump()
@@ -38,21 +67,19 @@ async def list_trainees(db: Session = Depends(get_db), _admin: dict = Depends(ge
 
 
 @router.post("/register-self", response_model=APIResponse)
-async def register_self(body: TraineeSelfRegister, db: Session = Depends(get_db)):
-    if db.query(Trainee).filter(Trainee.unique_name == body.unique_name).first():
+async def register_self(body: TraineeSelfRegister, db: AsyncSession = Depends(get_async_db)):
+    if await db.scalar(select(Trainee.id).where(Trainee.unique_name == body.unique_name)) is not None:
         raise HTTPException(status_code=400, detail="Name already registered")
 
     if len(body.frames) < 1:
         raise HTTPException(status_code=400, detail="At least one frame required")
 
-    embeddings = []
-    for frame_b64 in body.frames:
-        try:
-            emb = await get_embedding(frame_b64)
-            embeddings.append(emb)
-        except ValueError:
-            # Skip frames where MTCNN cannot detect a face (e.g. profile/angled shots)
-            pass
+    # Skip frames where MTCNN cannot detect a face (e.g. profile/angled shots)
+    embeddings = [
+        (pose_tag(idx), emb)
+        for idx, emb in enumerate(await get_embeddings_batch(body.frames))
+        if emb is not None
+    ]
 
     if not embeddings:
         raise HTTPException(
@@ -64,13 +91,12 @@ async def register_self(body: TraineeSelfRegister, db: Session = Depends(get_db)
     if body.email:
         trainee.email = body.email
     db.add(trainee)
-    db.flush()
+    await db.flush()
 
-    avg = average_embeddings(embeddings)
-    face = FaceEmbedding(trainee_id=trainee.id, embedding=json.dumps(avg), source="camera")
-    db.add(face)
-    db.commit()
-    db.refresh(trainee)
+    templates = await db.run_sync(_store_templates, trainee.id, embeddings, "camera")
+    await db.run_sync(bump, TRAINEES_ENTITY)
+    await db.commit()
+    gallery.add(trainee.id, templates)
 
     return APIResponse(
         success=True,
@@ -84,36 +110,30 @@ async def register_by_admin(
     unique_name: str = Form(...),
     images: list[UploadFile] = File(...),
     email: str | None = Form(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     _admin: dict = Depends(get_current_admin),
 ):
-    if db.query(Trainee).filter(Trainee.unique_name == unique_name).first():
+    if await db.scalar(select(Trainee.id).where(Trainee.unique_name == unique_name)) is not None:
         raise HTTPException(status_code=400, detail="Name already registered")
 
     if len(images) < 1 or len(images) > 5:
         raise HTTPException(status_code=400, detail="Provide 1 to 5 images")
 
-    embeddings = []
-    for img_file in images:
-        raw = await img_file.read()
-        b64 = base64.b64encode(raw).decode()
-        try:
-            emb = await get_embedding(b64)
-        except ValueError as e:
-            raise HTTPException(status_code=400, detail=f"No face detected in one of the uploaded images. Ensure each image shows a clear face.")
-        embeddings.append(emb)
+    frames = [base64.b64encode(await img_file.read()).decode() for img_file in images]
+    embeddings = await get_embeddings_batch(frames)
+    if any(emb is None for emb in embeddings):
+        raise HTTPException(status_code=400, detail=f"No face detected in one of the uploaded images. Ensure each image shows a clear face.")
 
     trainee = Trainee(unique_name=unique_name, registered_by="admin")
     if email:
         trainee.email = email
     db.add(trainee)
-    db.flush()
+    await db.flush()
 
-    avg = average_embeddings(embeddings)
-    face = FaceEmbedding(trainee_id=trainee.id, embedding=json.dumps(avg), source="upload")
-    db.add(face)
-    db.commit()
-    db.refresh(trainee)
+    templates = await db.run_sync(_store_templates, trainee.id, [(None, emb) for emb in embeddings], "upload")
+    await db.run_sync(bump, TRAINEES_ENTITY)
+    await db.commit()
+    gallery.add(trainee.id, templates)
 
     return APIResponse(success=True, data=TraineeOut.model_validate(trainee).model_dump(), message="Trainee registered by admin")
 
@@ -121,14 +141,18 @@ async def register_by_admin(
 @router.delete("/{trainee_id}", response_model=APIResponse)
 async def delete_trainee(
     trainee_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     _admin: dict = Depends(get_current_admin),
 ):
-    trainee = db.query(Trainee).filter(Trainee.id == trainee_id).first()
+    trainee = await db.get(Trainee, trainee_id)
     if not trainee:
         raise HTTPException(status_code=404, detail="Trainee not found")
 
-    db.query(Attendance).filter(Attendance.trainee_id == trainee_id).delete()
-    db.delete(trainee)
-    db.commit()
+    await db.run_sync(remove_trainee_from_summaries, trainee_id)
+    await db.execute(delete(Attendance).where(Attendance.trainee_id == trainee_id))
+    await db.delete(trainee)
+    await db.run_sync(bump, TRAINEES_ENTITY)
+    await db.run_sync(bump, ATTENDANCE_ENTITY)
+    await db.commit()
+    gallery.remove_trainee(trainee_id)
     return APIResponse(success=True, message="Trainee deleted")
@@ -8,6 +8,11 @@ class APIResponse(BaseModel):
     message: str = ""
 
 
+class PagedResponse(APIResponse):
+    # Pass back as ?cursor= to get the next page; None on the last page
+    next_cursor: str | None = None
+
+
 # Auth
 class LoginRequest(BaseModel):
     username: str
@@ -43,6 +48,8 @@ class TraineeOut(BaseModel):
 # Attendance
 class AttendanceFrameRequest(BaseModel):
     frame: str
+    # Ticket returned by /identify for this frame; skips liveness and matching when valid
+    ticket: str | None = None
 
 
 class AttendanceOut(BaseModel):
@@ -81,3 +88,10 @@ class SettingOut(BaseModel):
     value: str
 
     model_config = {"from_attributes": True}
+
+
+# Reports
+class ReportJobRequest(BaseModel):
+    format: str = "excel"
+    from_date: date | None = None
+    to_date: date | None = None
@@ -0,0 +1,132 @@
+from datetime import date, timedelta
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from models import Attendance, DailySummary, Trainee
+
+GRANULARITIES = ("day", "week", "month")
+
+
+def _insert(db: Session):
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(DailySummary)
+
+
+def adjust_daily_summary(db: Session, day: date, status: str, count: int = 1) -> None:
+    """Add `count` checked-in rows with `status` to the day's totals (negative to remove them).
+
+    A single upsert of relative increments, so concurrent check-ins on the same
+    day can't overwrite each other's counts.
+    """
+    values = {
+        "present": count if status == "present" else 0,
+        "late": count if status == "late" else 0,
+        "checked_in": count,
+    }
+    stmt = _insert(db).values(date=day, **values)
+    existing = DailySummary.__table__.c
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DailySummary.date],
+        set_={column: existing[column] + stmt.excluded[column] for column in values},
+    )
+    db.execute(stmt)
+
+
+def remove_trainee_from_summaries(db: Session, trainee_id: int) -> None:
+    """Take a trainee's check-ins out of the totals before their attendance rows are deleted."""
+    rows = db.execute(
+        select(Attendance.date, Attendance.status, func.count())
+        .where(Attendance.trainee_id == trainee_id, Attendance.checkin_time.is_not(None))
+        .group_by(Attendance.date, Attendance.status)
+    ).all()
+    for day, status, count in rows:
+        adjust_daily_summary(db, day, status, -count)
+
+
+def _bucket_start(day: date, granularity: str) -> date:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+_LABELS = {"day": "%a", "week": "%d %b", "month": "%b %Y"}
+
+
+def attendance_summary(db: Session, from_date: date, to_date: date, granularity: str = "day") -> list[dict]:
+    """Present/late/absent totals per day, week (from Monday) or month, read from daily_summaries.
+
+    Absent is every trainee who didn't check in as present or late, counted per day.
+    Raises ValueError for an unknown granularity or an inverted range.
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity: {granularity}")
+    if from_date > to_date:
+        raise ValueError("'from' must not be after 'to'")
+
+    total_trainees = db.query(func.count(Trainee.id)).scalar()
+    summaries = {
+        row.date: row
+        for row in db.query(DailySummary).filter(DailySummary.date >= from_date, DailySummary.date <= to_date)
+    }
+
+    buckets: dict[date, dict] = {}
+    day = from_date
+    while day <= to_date:
+        start = _bucket_start(day, granularity)
+        bucket = buckets.get(start)
+        if bucket is None:
+            bucket = buckets[start] = {
+                "date": start.isoformat(),
+                "label": start.strftime(_LABELS[granularity]),
+                "present": 0,
+                "late": 0,
+                "absent": 0,
+                "total": 0,
+            }
+        summary = summaries.get(day)
+        present = summary.present if summary else 0
+        late = summary.late if summary else 0
+        bucket["present"] += present
+        bucket["late"] += late
+        bucket["absent"] += max(total_trainees - present - late, 0)
+        bucket["total"] += total_trainees
+        day += timedelta(days=1)
+    return list(buckets.values())
+
+
+def punctuality(db: Session, from_date: date, to_date: date) -> list[dict]:
+    """Per-trainee check-in counts and on-time rate for the range, in one grouped query.
+
+    Reads attendance directly rather than a summary: with one row per trainee per
+    day (uq_attendance_trainee_date), a per-trainee daily aggregate would hold the
+    same rows. The date range is served by ix_attendance_history, so the cost
+    follows the rows in the range, not the size of the table.
+    """
+    if from_date > to_date:
+        raise ValueError("'from' must not be after 'to'")
+    present = func.sum(case((Attendance.status == "present", 1), else_=0))
+    late = func.sum(case((Attendance.status == "late", 1), else_=0))
+    rows = db.execute(
+        select(Trainee.id, Trainee.unique_name, func.count(Attendance.id), present, late)
+        .join(Attendance, Attendance.trainee_id == Trainee.id)
+        .where(Attendance.date >= from_date, Attendance.date <= to_date, Attendance.checkin_time.is_not(None))
+        .group_by(Trainee.id, Trainee.unique_name)
+        .order_by(Trainee.unique_name)
+    ).all()
+    return [
+        {
+            "trainee_id": trainee_id,
+            "trainee_name": name,
+            "days_attended": attended,
+            "present": on_time,
+            "late": late_count,
+            "on_time_rate": round(on_time / attended, 3) if attended else None,
+        }
+        for trainee_id, name, attended, on_time, late_count in rows
+    ]
@@ -0,0 +1,239 @@
+"""Optional HNSW index over gallery templates for large, multi-site deployments.
+
+The index only proposes candidate trainees; the gallery re-scores their
+templates exactly, so approximation can cost recall but never changes a score.
+Below ANN_MIN_GALLERY_SIZE templates the gallery keeps using exact search.
+
+Requires the optional hnswlib package. Pick parameters with:
+
+  python -m services.ann_index --trainees 20000 --templates 5
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# "auto": use the index once the gallery is large enough and hnswlib is installed; "off": always exact
+ANN_INDEX = os.getenv("ANN_INDEX", "auto").lower()
+ANN_MIN_GALLERY_SIZE = int(os.getenv("ANN_MIN_GALLERY_SIZE", "5000"))
+ANN_INDEX_PATH = os.getenv("ANN_INDEX_PATH", "") or os.path.join(
+    os.getenv("TORCH_HOME") or os.path.join(os.path.expanduser("~"), ".cache", "torch"),
+    "scanin",
+    "gallery.hnsw",
+)
+ANN_M = int(os.getenv("ANN_M", "16"))
+ANN_EF_CONSTRUCTION = int(os.getenv("ANN_EF_CONSTRUCTION", "200"))
+ANN_EF_SEARCH = int(os.getenv("ANN_EF_SEARCH", "64"))
+# Nearest templates fetched per scan; their trainees are re-scored exactly
+ANN_CANDIDATES = int(os.getenv("ANN_CANDIDATES", "32"))
+
+
+def ann_available() -> bool:
+    if ANN_INDEX == "off":
+        return False
+    try:
+        import hnswlib  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class HnswIndex:
+    """Inner-product HNSW index over pre-normalised templates, labelled by FaceEmbedding id."""
+
+    def __init__(self, dim: int, ef_search: int = ANN_EF_SEARCH, candidates: int = ANN_CANDIDATES):
+        self.dim = dim
+        self._ef_search = ef_search
+        self._candidates = candidates
+        self._index = None
+        self._trainee_of: dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._trainee_of)
+
+    def _new_index(self, capacity: int):
+        import hnswlib
+
+        index = hnswlib.Index(space="ip", dim=self.dim)
+        index.init_index(max_elements=max(capacity, 1024), ef_construction=ANN_EF_CONSTRUCTION, M=ANN_M)
+        index.set_ef(self._ef_search)
+        return index
+
+    def build(self, vectors: np.ndarray, row_ids: np.ndarray, trainee_ids: np.ndarray) -> None:
+        index = self._new_index(int(len(row_ids) * 1.25))
+        if len(row_ids):
+            index.add_items(vectors, row_ids)
+        with self._lock:
+            self._index = index
+            self._trainee_of = dict(zip(row_ids.tolist(), trainee_ids.tolist()))
+
+    def add(self, vectors: np.ndarray, row_ids: list[int], trainee_id: int) -> None:
+        self._add(vectors, row_ids, [trainee_id] * len(row_ids))
+
+    def _add(self, vectors: np.ndarray, row_ids: list[int], trainee_ids: list[int]) -> None:
+        with self._lock:
+            needed = self._index.get_current_count() + len(row_ids)
+            if needed > self._index.get_max_elements():
+                self._index.resize_index(needed * 2)
+            self._index.add_items(vectors, row_ids)
+            self._trainee_of.update(zip(row_ids, trainee_ids))
+
+    def reconcile(self, vectors: np.ndarray, row_ids: np.ndarray, trainee_ids: np.ndarray) -> tuple[int, int]:
+        """Add and remove templates so the index holds exactly these rows; returns (added, removed)."""
+        with self._lock:
+            known = set(self._trainee_of)
+        wanted = set(row_ids.tolist())
+        removed = [row_id for row_id in known if row_id not in wanted]
+        self.remove(removed)
+        new = np.flatnonzero([row_id not in known for row_id in row_ids.tolist()])
+        if len(new):
+            self._add(vectors[new], row_ids[new].tolist(), trainee_ids[new].tolist())
+        return len(new), len(removed)
+
+    def remove(self, row_ids: list[int]) -> None:
+        with self._lock:
+            for row_id in row_ids:
+                if self._trainee_of.pop(row_id, None) is not None:
+                    self._index.mark_deleted(row_id)
+
+    def candidate_trainees(self, query: np.ndarray) -> np.ndarray:
+        k = min(self._candidates, len(self._trainee_of))
+        if k == 0:
+            return np.empty(0, dtype=np.int64)
+        labels, _ = self._index.knn_query(query, k=k)
+        trainee_of = self._trainee_of
+        return np.unique([trainee_of[label] for label in labels[0].tolist() if label in trainee_of])
+
+    def save(self, path: str, signature: tuple[int, int | None]) -> None:
+        """Persist the index with the gallery signature it was built from.
+
+        The index goes to a fresh file and is published by atomically replacing
+        the metadata that names it, so workers saving at once can't leave the
+        index and its labels out of step, and readers never see a partial file.
+        """
+        directory, name = os.path.split(path)
+        os.makedirs(directory, exist_ok=True)
+        index_file = f"{name}.{uuid.uuid4().hex}"
+        with self._lock:
+            self._index.save_index(os.path.join(directory, index_file))
+            meta = {"signature": list(signature), "trainee_of": self._trainee_of, "dim": self.dim, "index_file": index_file}
+        tmp = f"{path}.json.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp, f"{path}.json")
+        _remove_unpublished(directory, name, index_file)
+
+    def load(self, path: str, signature: tuple[int, int | None]) -> bool:
+        """Load a persisted index if it was built from the same gallery contents."""
+        import hnswlib
+
+        try:
+            with open(f"{path}.json") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if meta.get("dim") != self.dim or tuple(meta.get("signature", ())) != tuple(signature) or "index_file" not in meta:
+            return False
+
+        index = hnswlib.Index(space="ip", dim=self.dim)
+        try:
+            index.load_index(os.path.join(os.path.dirname(path), meta["index_file"]), allow_replace_deleted=False)
+        except RuntimeError:
+            logger.warning("Could not read ANN index at %s — rebuilding", path)
+            return False
+        index.set_ef(self._ef_search)
+        with self._lock:
+            self._index = index
+            self._trainee_of = {int(k): v for k, v in meta["trainee_of"].items()}
+        return True
+
+
+# Another worker may still be writing an index it hasn't published yet
+_UNPUBLISHED_GRACE_SECONDS = 600
+
+
+def _remove_unpublished(directory: str, name: str, current: str) -> None:
+    """Delete index files the metadata no longer names (replaced or lost to a concurrent save)."""
+    cutoff = time.time() - _UNPUBLISHED_GRACE_SECONDS
+    for entry in os.scandir(directory):
+        if not entry.name.startswith(f"{name}.") or entry.name == current or entry.name.endswith((".json", ".tmp")):
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+def _synthetic_gallery(trainees: int, templates: int, dim: int, rng: np.random.Generator):
+    centers = rng.normal(size=(trainees, dim)).astype(np.float32)
+    vectors = np.repeat(centers, templates, axis=0) + 0.35 * rng.normal(size=(trainees * templates, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    trainee_ids = np.repeat(np.arange(trainees, dtype=np.int64), templates)
+    return centers, vectors, trainee_ids
+
+
+def main() -> None:
+    """Recall/latency benchmark of ANN-backed gallery search against the exact scan."""
+    import argparse
+    import time
+
+    from services.gallery_service import EmbeddingGallery, _Snapshot
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--trainees", type=int, default=20000)
+    parser.add_argument("--templates", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--ef", type=int, nargs="+", default=[16, 32, 64, 128])
+    parser.add_argument("--candidates", type=int, default=ANN_CANDIDATES)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    centers, vectors, trainee_ids = _synthetic_gallery(args.trainees, args.templates, args.dim, rng)
+    row_ids = np.arange(len(vectors), dtype=np.int64)
+
+    gallery = EmbeddingGallery()
+    gallery._snapshot = _Snapshot.build(vectors, trainee_ids, row_ids)
+    gallery._loaded = True
+
+    picks = rng.integers(0, args.trainees, size=args.queries)
+    queries = centers[picks] + 0.35 * rng.normal(size=(args.queries, args.dim)).astype(np.float32)
+
+    def run() -> tuple[list[int], str]:
+        found, timings = [], []
+        for query in queries:
+            started = time.perf_counter()
+            found.append(gallery.search(query)[0])
+            timings.append(time.perf_counter() - started)
+        ms = np.array(timings) * 1000
+        return found, f"p50={np.percentile(ms, 50):.2f}ms p99={np.percentile(ms, 99):.2f}ms"
+
+    exact, latency = run()
+    print(f"exact          {latency}")
+
+    started = time.perf_counter()
+    index = HnswIndex(args.dim, candidates=args.candidates)
+    index.build(vectors, row_ids, trainee_ids)
+    print(f"build {len(vectors)} templates in {time.perf_counter() - started:.1f}s (M={ANN_M}, ef_construction={ANN_EF_CONSTRUCTION})")
+    gallery._ann = index
+
+    for ef in args.ef:
+        # hnswlib needs ef >= k, so the effective ef is at least the candidate count
+        effective_ef = max(ef, args.candidates)
+        index._index.set_ef(effective_ef)
+        found, latency = run()
+        recall = np.mean(np.array(found) == np.array(exact))
+        note = f" (requested {ef}, raised to --candidates)" if effective_ef != ef else ""
+        print(f"ef={effective_ef:<4} recall@1={recall:.4f} {latency}{note}")
+
+
+if __name__ == "__main__":
+    main()
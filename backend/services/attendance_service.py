@@ -0,0 +1,167 @@
+import base64
+import json
+import os
+from datetime import date, datetime
+from typing import NamedTuple
+
+from sqlalchemy import and_, case, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from core.data_version import ATTENDANCE_ENTITY, bump
+from models import Attendance, Trainee
+from services.analytics_service import adjust_daily_summary
+from services.storage_service import get_capture_url
+
+ATTENDANCE_PAGE_SIZE = int(os.getenv("ATTENDANCE_PAGE_SIZE", "100"))
+ATTENDANCE_MAX_PAGE_SIZE = int(os.getenv("ATTENDANCE_MAX_PAGE_SIZE", "500"))
+
+
+class ScanOutcome(NamedTuple):
+    action: str  # "checkin" or "checkout"
+    record_id: int
+    checkin_time: datetime
+    checkout_time: datetime | None
+    status: str
+
+
+def _insert(db: Session):
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(Attendance)
+
+
+def _outcome(db: Session, row) -> ScanOutcome | None:
+    if row is None:
+        return None
+    bump(db, ATTENDANCE_ENTITY)
+    action = "checkin" if row.checkout_time is None else "checkout"
+    return ScanOutcome(action, row.id, row.checkin_time, row.checkout_time, row.status)
+
+
+_RETURNING = (Attendance.id, Attendance.checkin_time, Attendance.checkout_time, Attendance.status)
+
+
+def record_scan(db: Session, trainee_id: int, day: date, now: datetime, image: str, checkin_status: str) -> ScanOutcome | None:
+    """Record a kiosk scan as today's check-in, or as the check-out if already checked in.
+
+    One INSERT ... ON CONFLICT statement against the (trainee_id, date) unique
+    index decides which, so double submits can't create two rows. Returns None
+    when the trainee has already checked in and out today.
+    """
+    stmt = _insert(db).values(
+        trainee_id=trainee_id, date=day, checkin_time=now, checkin_image=image, status=checkin_status,
+    )
+    existing = Attendance.__table__.c
+    first_scan = existing.checkin_time.is_(None)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Attendance.trainee_id, Attendance.date],
+        set_={
+            # A row without a check-in (e.g. added by an admin) takes this scan as its check-in
+            "checkin_time": case((first_scan, stmt.excluded.checkin_time), else_=existing.checkin_time),
+            "checkin_image": case((first_scan, stmt.excluded.checkin_image), else_=existing.checkin_image),
+            "status": case((first_scan, stmt.excluded.status), else_=existing.status),
+            "checkout_time": case((first_scan, None), else_=stmt.excluded.checkin_time),
+            "checkout_image": case((first_scan, None), else_=stmt.excluded.checkin_image),
+        },
+        where=existing.checkout_time.is_(None),
+    ).returning(*_RETURNING)
+    outcome = _outcome(db, db.execute(stmt).one_or_none())
+    if outcome is not None and outcome.action == "checkin":
+        # The check-in status is fixed from here on; checking out leaves the day's totals alone
+        adjust_daily_summary(db, day, outcome.status)
+    return outcome
+
+
+def record_checkout(db: Session, trainee_id: int, day: date, now: datetime, image: str) -> ScanOutcome | None:
+    """Set today's check-out in one statement; None if not checked in or already checked out."""
+    stmt = (
+        update(Attendance)
+        .where(and_(
+            Attendance.trainee_id == trainee_id,
+            Attendance.date == day,
+            Attendance.checkin_time.is_not(None),
+            Attendance.checkout_time.is_(None),
+        ))
+        .values(checkout_time=now, checkout_image=image)
+        .returning(*_RETURNING)
+        .execution_options(synchronize_session=False)
+    )
+    return _outcome(db, db.execute(stmt).one_or_none())
+
+
+# Newest first; rows without a check-in (e.g. added by an admin) sort last within their day
+_HISTORY_ORDER = (Attendance.date.desc(), Attendance.checkin_time.desc().nulls_last(), Attendance.id.desc())
+
+
+def encode_cursor(row) -> str:
+    key = [row.date.isoformat(), row.checkin_time.isoformat() if row.checkin_time else None, row.id]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[date, datetime | None, int]:
+    try:
+        day, checkin, record_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return date.fromisoformat(day), datetime.fromisoformat(checkin) if checkin else None, int(record_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+def _after(cursor: str):
+    """Rows that come after the cursor row in _HISTORY_ORDER."""
+    day, checkin, record_id = _decode_cursor(cursor)
+    if checkin is None:
+        same_day_after = and_(Attendance.checkin_time.is_(None), Attendance.id < record_id)
+    else:
+        same_day_after = or_(
+            Attendance.checkin_time < checkin,
+            Attendance.checkin_time.is_(None),
+            and_(Attendance.checkin_time == checkin, Attendance.id < record_id),
+        )
+    return or_(Attendance.date < day, and_(Attendance.date == day, same_day_after))
+
+
+def attendance_page(db: Session, filters: list, cursor: str | None, limit: int) -> tuple[list[dict], str | None]:
+    """One page of attendance rows with trainee names, plus the cursor for the next page (None at the end).
+
+    Keyset pagination: each page is an index range scan, however deep the user pages.
+    Raises ValueError for a malformed cursor.
+    """
+    stmt = (
+        select(
+            Attendance.id,
+            Attendance.trainee_id,
+            func.coalesce(Trainee.unique_name, "Unknown").label("trainee_name"),
+            Attendance.date,
+            Attendance.checkin_time,
+            Attendance.checkout_time,
+            Attendance.checkin_image,
+            Attendance.checkout_image,
+            Attendance.status,
+        )
+        .outerjoin(Trainee, Trainee.id == Attendance.trainee_id)
+        .where(*filters)
+        .order_by(*_HISTORY_ORDER)
+        .limit(limit + 1)
+    )
+    if cursor:
+        stmt = stmt.where(_after(cursor))
+
+    rows = db.execute(stmt).all()
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    data = [
+        {
+            "id": r.id,
+            "trainee_id": r.trainee_id,
+            "trainee_name": r.trainee_name,
+            "date": r.date,
+            "checkin_time": r.checkin_time,
+            "checkout_time": r.checkout_time,
+            "checkin_image": get_capture_url(r.checkin_image) if r.checkin_image else None,
+            "checkout_image": get_capture_url(r.checkout_image) if r.checkout_image else None,
+            "status": r.status,
+        }
+        for r in rows[:limit]
+    ]
+    return data, next_cursor
@@ -0,0 +1,123 @@
+"""Background delivery of the email_outbox table.
+
+Each worker runs one sender that claims pending rows in batches (FOR UPDATE
+SKIP LOCKED on Postgres, so workers never send the same row) and delivers
+them over a single persistent SMTP session. Failed messages are retried with
+exponential backoff and marked "failed" after EMAIL_OUTBOX_MAX_ATTEMPTS.
+"""
+import asyncio
+import logging
+import os
+import smtplib
+from datetime import datetime, timedelta
+
+from database import SessionLocal
+from models import EmailOutbox
+from services.notification_service import SmtpSession, smtp_configured
+
+logger = logging.getLogger(__name__)
+
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "20"))
+# How often to look for mail queued by other workers or due for a retry
+EMAIL_OUTBOX_POLL_SECONDS = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", "5"))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "8"))
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(3600, 30 * 2 ** (attempts - 1)))
+
+
+def _is_server_unavailable(error: Exception) -> bool:
+    """True when the SMTP server itself is unreachable, as opposed to one message being rejected."""
+    if isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, smtplib.SMTPAuthenticationError)):
+        return True
+    return not isinstance(error, smtplib.SMTPException)
+
+
+class OutboxSender:
+    def __init__(self, batch_size: int, poll_seconds: float, max_attempts: int):
+        self._batch_size = batch_size
+        self._poll_seconds = poll_seconds
+        self._max_attempts = max_attempts
+        self._smtp = SmtpSession()
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self.sent = 0
+        self.failures = 0
+
+    def start(self) -> None:
+        if not smtp_configured():
+            logger.info("SMTP not configured — email outbox sender not started")
+            return
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await asyncio.to_thread(self._smtp.close)
+
+    def wake(self) -> None:
+        """Deliver newly committed mail now instead of at the next poll."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _run(self) -> None:
+        while True:
+            self._wake.clear()
+            try:
+                claimed = await asyncio.to_thread(self._send_batch)
+            except Exception as e:
+                logger.error("Email outbox batch failed: %s", e)
+                claimed = 0
+            if claimed == self._batch_size:
+                continue  # more may be waiting
+            try:
+                await asyncio.wait_for(self._wake.wait(), self._poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def _send_batch(self) -> int:
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            rows = (
+                db.query(EmailOutbox)
+                .filter(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now)
+                .order_by(EmailOutbox.id)
+                .limit(self._batch_size)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            for row in rows:
+                try:
+                    self._smtp.send(row.recipient, row.subject, row.body)
+                except Exception as e:
+                    self.failures += 1
+                    row.attempts += 1
+                    row.last_error = str(e)[:500]
+                    if row.attempts >= self._max_attempts:
+                        row.status = "failed"
+                        logger.error("Giving up on email %d to %s after %d attempts: %s", row.id, row.recipient, row.attempts, e)
+                    else:
+                        row.next_attempt_at = datetime.utcnow() + _retry_delay(row.attempts)
+                        logger.warning("Email %d to %s failed (attempt %d): %s", row.id, row.recipient, row.attempts, e)
+                    if _is_server_unavailable(e):
+                        # Leave the rest of the batch for the next poll instead of timing out on each
+                        db.commit()
+                        return 0
+                    continue
+                self.sent += 1
+                db.delete(row)
+            db.commit()
+            return len(rows)
+        finally:
+            db.close()
+
+    def metrics(self) -> dict:
+        return {"sent": self.sent, "failures": self.failures}
+
+
+outbox_sender = OutboxSender(EMAIL_OUTBOX_BATCH_SIZE, EMAIL_OUTBOX_POLL_SECONDS, EMAIL_OUTBOX_MAX_ATTEMPTS)
@@ -0,0 +1,37 @@
+import struct
+
+import numpy as np
+
+EMBEDDING_DIM = 512
+# Bump when the embedding model changes — vectors from different models are not comparable
+MODEL_VERSION = 1  # facenet-pytorch InceptionResnetV1, vggface2 weights
+
+_MAGIC = b"FE"
+_CODEC_VERSION = 1
+# magic, codec version, model version, dimension — 8 bytes keeps the float32 payload aligned
+_HEADER = struct.Struct("<2sBBI")
+_DTYPE = np.dtype("<f4")
+
+
+def encode_embedding(embedding, model_version: int = MODEL_VERSION) -> bytes:
+    """Pack an embedding as an 8-byte header followed by little-endian float32 values."""
+    vector = np.asarray(embedding, dtype=_DTYPE).ravel()
+    return _HEADER.pack(_MAGIC, _CODEC_VERSION, model_version, vector.size) + vector.tobytes()
+
+
+def read_header(blob: bytes) -> tuple[int, int]:
+    """Return (model_version, dimension) from an encoded embedding."""
+    if len(blob) < _HEADER.size:
+        raise ValueError("Embedding blob is too short")
+    magic, codec_version, model_version, dim = _HEADER.unpack_from(blob)
+    if magic != _MAGIC or codec_version != _CODEC_VERSION:
+        raise ValueError("Unrecognised embedding blob format")
+    if len(blob) != _HEADER.size + dim * _DTYPE.itemsize:
+        raise ValueError("Embedding blob length does not match its header")
+    return model_version, dim
+
+
+def decode_embedding(blob: bytes) -> np.ndarray:
+    """Return a read-only float32 view over the blob payload (no copy)."""
+    _, dim = read_header(blob)
+    return np.frombuffer(blob, dtype=_DTYPE, count=dim, offset=_HEADER.size)
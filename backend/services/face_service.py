@@ -1,81 +1,143 @@
 import io
-import json
+import os
 import logging
 import base64
-import numpy as np
-import torch
+from typing import TYPE_CHECKING
+
 from PIL import Image
-from facenet_pytorch import MTCNN, InceptionResnetV1
 from sqlalchemy.orm import Session
 
-_logger = logging.getLogger(__name__)
-_logger.info("Loading FaceNet model (MTCNN + InceptionResnetV1)...")
-_mtcnn = MTCNN(
-    image_size=160,
-    margin=40,
-    keep_all=False,
-    post_process=True,
-    min_face_size=20,
-    thresholds=[0.5, 0.6, 0.6],
+from services.gallery_service import gallery
+from services.inference_service import (
+    INFERENCE_MAX_BATCH,
+    INFERENCE_MAX_WAIT_MS,
+    MicroBatcher,
+    inference_executor,
 )
-_resnet = InceptionResnetV1(pretrained="vggface2").eval()
-_logger.info("FaceNet model loaded.")
-
+from services.model_registry import model_registry
 
-def cosine_similarity(a: list[float], b: list[float]) -> float:
-    a_arr, b_arr = np.array(a), np.array(b)
-    norm_product = np.linalg.norm(a_arr) * np.linalg.norm(b_arr)
-    if norm_product == 0:
-        return 0.0
-    return float(np.dot(a_arr, b_arr) / norm_product)
+if TYPE_CHECKING:
+    import torch
 
+# Long side (pixels) frames are resized to before MTCNN runs
+DETECTION_MAX_SIDE = int(os.getenv("DETECTION_MAX_SIDE", "640"))
 
-def average_embeddings(embeddings: list[list[float]]) -> list[float]:
-    return np.mean(embeddings, axis=0).tolist()
+_logger = logging.getLogger(__name__)
 
 
-async def get_embedding(base64_image: str) -> list[float]:
-    image_bytes = base64.b64decode(base64_image)
-    image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-
-    # Scale up small images so MTCNN can detect faces reliably
-    min_dim = min(image.size)
-    if min_dim < 400:
-        scale = 400 / min_dim
-        image = image.resize(
-            (int(image.width * scale), int(image.height * scale)),
-            Image.LANCZOS,
-        )
-
-    face_tensor = _mtcnn(image)
+def _decode_image(base64_image: str) -> Image.Image:
+    image = Image.open(io.BytesIO(base64.b64decode(base64_image)))
+    return image if image.mode == "RGB" else image.convert("RGB")
+
+
+def _detection_view(image: Image.Image) -> tuple[Image.Image, float]:
+    """Resize to the fixed detection resolution; returns (view, view/original scale).
+
+    P-Net cost grows with pixel count, so tiny kiosk frames and 12 MP uploads all
+    go through MTCNN at the same size. BILINEAR is plenty for finding a box — the
+    face itself is cropped from the original pixels.
+    """
+    scale = DETECTION_MAX_SIDE / max(image.size)
+    if abs(scale - 1) < 0.01:
+        return image, 1.0
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    return image.resize(size, Image.BILINEAR), scale
+
+
+def _detect_faces(base64_images: list[str]) -> list["torch.Tensor | None"]:
+    from facenet_pytorch import extract_face, fixed_image_standardization
+
+    mtcnn = model_registry.mtcnn
+    images: list[Image.Image | None] = []
+    for idx, b64 in enumerate(base64_images):
+        try:
+            images.append(_decode_image(b64))
+        except (ValueError, OSError) as e:
+            # Bad base64 or not an image counts as "no face" rather than failing the whole batch
+            _logger.warning("Could not decode frame %d: %s", idx, e)
+            images.append(None)
+    views = [_detection_view(image) if image is not None else None for image in images]
+
+    # MTCNN only batches equally sized images, so run one pass per distinct size
+    by_size: dict[tuple[int, int], list[int]] = {}
+    for idx, view in enumerate(views):
+        if view is not None:
+            by_size.setdefault(view[0].size, []).append(idx)
+
+    faces: list["torch.Tensor | None"] = [None] * len(images)
+    for indices in by_size.values():
+        batch_boxes, _ = mtcnn.detect([views[i][0] for i in indices])
+        for idx, boxes in zip(indices, batch_boxes):
+            if boxes is None or len(boxes) == 0:
+                continue
+            # detect() orders boxes largest first (select_largest), matching mtcnn(image)
+            box = boxes[0] / views[idx][1]
+            face = extract_face(images[idx], box, image_size=mtcnn.image_size, margin=mtcnn.margin)
+            faces[idx] = fixed_image_standardization(face)
+    return faces
+
+
+def _detect_face(base64_image: str) -> "torch.Tensor":
+    face_tensor = _detect_faces([base64_image])[0]
     if face_tensor is None:
         raise ValueError("No face detected in image. Please ensure your face is clearly visible.")
+    return face_tensor
+
+
+def _embed_faces(face_tensors: list["torch.Tensor"]) -> list[list[float]]:
+    import torch
+
+    return model_registry.embedder.embed(torch.stack(face_tensors)).tolist()
+
+
+# Concurrent scans share one batched InceptionResnetV1 forward pass
+_embedder = MicroBatcher(_embed_faces, inference_executor, INFERENCE_MAX_BATCH, INFERENCE_MAX_WAIT_MS)
+
+
+async def detect_face(base64_image: str) -> "torch.Tensor":
+    """Decode the frame and return the standardised 160x160 face crop (ValueError if none)."""
+    # Decoding, MTCNN and the ResNet pass are CPU-bound — keep them off the event loop
+    return await inference_executor.run(_detect_face, base64_image)
+
+
+async def embed_face(face_tensor: "torch.Tensor") -> list[float]:
+    return await _embedder.submit(face_tensor)
+
+
+async def get_embedding(base64_image: str) -> list[float]:
+    return await embed_face(await detect_face(base64_image))
+
+
+def _embed_frames(base64_images: list[str]) -> list[list[float] | None]:
+    faces = _detect_faces(base64_images)
+    detected = [face for face in faces if face is not None]
+    embeddings = iter(_embed_faces(detected) if detected else [])
+    return [next(embeddings) if face is not None else None for face in faces]
+
 
-    with torch.no_grad():
-        embedding = _resnet(face_tensor.unsqueeze(0)).squeeze().tolist()
-    return embedding
+async def get_embeddings_batch(base64_images: list[str]) -> list[list[float] | None]:
+    """Embed several frames with one MTCNN pass per image size and one ResNet pass.
 
+    Returns one entry per frame, in order — None where no face was detected
+    or the frame couldn't be decoded.
+    """
+    return await inference_executor.run(_embed_frames, base64_images)
 
-def find_best_match(new_embedding: list[float], db: Session):
-    from models import FaceEmbedding, Trainee, Setting
 
-    threshold = 0.6
-    similarity_setting = db.query(Setting).filter(Setting.key == "similarity_threshold").first()
-    if similarity_setting:
-        threshold = float(similarity_setting.value)
+def match_face(new_embedding: list[float], db: Session, threshold: float | None = None):
+    """Return (trainee, score) for the closest stored face, trainee None below the threshold.
 
-    all_face_rows = db.query(FaceEmbedding).all()
+    The threshold defaults to the similarity_threshold setting.
+    """
+    from models import Trainee
+    from services.settings_service import get_app_settings
 
-    best_trainee_id = None
-    best_score = -1.0
+    if threshold is None:
+        threshold = get_app_settings(db).similarity_threshold
 
-    for row in all_face_rows:
-        stored = json.loads(row.embedding) if isinstance(row.embedding, str) else row.embedding
-        score = cosine_similarity(new_embedding, stored)
-        if score > best_score:
-            best_score = score
-            best_trainee_id = row.trainee_id
+    gallery.sync(db)
+    best_trainee_id, best_score = gallery.search(new_embedding)
 
     if best_score >= threshold and best_trainee_id is not None:
-        return db.query(Trainee).filter(Trainee.id == best_trainee_id).first()
-    return None
+        return db.query(Trainee).filter(Trainee.id == best_trainee_id).first(), best_score
+    return None, best_score
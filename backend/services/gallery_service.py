@@ -0,0 +1,276 @@
+import logging
+import os
+import threading
+from typing import NamedTuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from services.ann_index import ANN_INDEX_PATH, ANN_MIN_GALLERY_SIZE, HnswIndex, ann_available
+from services.embedding_codec import MODEL_VERSION, decode_embedding, read_header
+
+logger = logging.getLogger(__name__)
+
+# A trainee's score is the mean of their best K template scores (K=1: max over templates)
+GALLERY_TEMPLATE_TOP_K = max(1, int(os.getenv("GALLERY_TEMPLATE_TOP_K", "1")))
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    # Zero vectors stay zero so they score 0.0 instead of NaN
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+
+class _Snapshot(NamedTuple):
+    # Rows are sorted by trainee so each trainee's templates form one contiguous segment
+    matrix: np.ndarray
+    trainee_ids: np.ndarray
+    row_ids: np.ndarray
+    segment_starts: np.ndarray
+
+    @classmethod
+    def build(cls, matrix: np.ndarray, trainee_ids: np.ndarray, row_ids: np.ndarray) -> "_Snapshot":
+        order = np.argsort(trainee_ids, kind="stable")
+        matrix, trainee_ids, row_ids = matrix[order], trainee_ids[order], row_ids[order]
+        starts = np.flatnonzero(np.r_[True, trainee_ids[1:] != trainee_ids[:-1]]) if len(trainee_ids) else trainee_ids
+        return cls(matrix, trainee_ids, row_ids, starts)
+
+
+_EMPTY = _Snapshot(
+    np.empty((0, 0), dtype=np.float32),
+    np.empty(0, dtype=np.int64),
+    np.empty(0, dtype=np.int64),
+    np.empty(0, dtype=np.int64),
+)
+
+
+def reduce_templates(scores: np.ndarray, segment_starts: np.ndarray, top_k: int) -> np.ndarray:
+    """Collapse per-template scores into one score per trainee segment.
+
+    top_k=1 is a max over each trainee's templates; larger values average the
+    best top_k (or all, for trainees with fewer templates).
+    """
+    if top_k == 1:
+        return np.maximum.reduceat(scores, segment_starts)
+
+    n = len(scores)
+    segment_of = np.repeat(np.arange(len(segment_starts)), np.diff(np.r_[segment_starts, n]))
+    # Sort by segment, then by descending score within it
+    order = np.lexsort((-scores, segment_of))
+    rank = np.arange(n) - segment_starts[segment_of]
+    kept = np.where(rank < top_k, scores[order], 0.0)
+    counts = np.minimum(np.diff(np.r_[segment_starts, n]), top_k)
+    return np.add.reduceat(kept, segment_starts) / counts
+
+
+class EmbeddingGallery:
+    """Process-wide, pre-normalised copy of every stored face template.
+
+    All templates live in one float32 matrix so a scan is a single matrix-vector
+    product followed by a per-trainee segment reduction. The snapshot is replaced
+    (never mutated) under a lock, so readers can search it without locking.
+
+    The ANN index is built, or brought up to date after a reload, on a background
+    thread; scans use exact search until it matches the snapshot again.
+    """
+
+    def __init__(self, top_k: int = GALLERY_TEMPLATE_TOP_K):
+        self._lock = threading.Lock()
+        self._top_k = top_k
+        self._snapshot = _EMPTY
+        # Rows from another model version stay in the table but never match
+        self._skipped: dict[int, int] = {}
+        # (row count, max row id) including skipped rows — what sync() compares with the table
+        self._signature: tuple[int, int | None] = (0, None)
+        self._loaded = False
+        # Candidate generator for very large galleries; None means exact search only
+        self._ann: HnswIndex | None = None
+        # An index taken out of service by a reload, waiting to be reconciled with the snapshot
+        self._ann_pending: HnswIndex | None = None
+        self._ann_wake = threading.Event()
+        self._ann_thread: threading.Thread | None = None
+
+    def __len__(self) -> int:
+        return len(self._snapshot.row_ids)
+
+    def _recompute_signature(self) -> None:
+        """Refresh self._signature after rows were replaced or removed (lock held)."""
+        row_ids = self._snapshot.row_ids
+        max_ids = ([int(row_ids.max())] if len(row_ids) else []) + list(self._skipped)
+        self._signature = (len(row_ids) + len(self._skipped), max(max_ids) if max_ids else None)
+
+    def load(self, db: Session) -> None:
+        from models import FaceEmbedding
+
+        rows = []
+        skipped = {}
+        for row in db.query(FaceEmbedding.id, FaceEmbedding.trainee_id, FaceEmbedding.embedding):
+            model_version, _ = read_header(row.embedding)
+            if model_version != MODEL_VERSION:
+                logger.warning("Skipping embedding %d from model version %d", row.id, model_version)
+                skipped[row.id] = row.trainee_id
+                continue
+            rows.append(row)
+
+        if rows:
+            snapshot = _Snapshot.build(
+                _normalize(np.stack([decode_embedding(r.embedding) for r in rows])),
+                np.array([r.trainee_id for r in rows], dtype=np.int64),
+                np.array([r.id for r in rows], dtype=np.int64),
+            )
+        else:
+            snapshot = _EMPTY
+
+        with self._lock:
+            self._snapshot = snapshot
+            self._skipped = skipped
+            self._recompute_signature()
+            self._loaded = True
+            # Another worker's changes may be missing from the index; search exactly until it catches up
+            if self._ann is not None:
+                self._ann_pending, self._ann = self._ann, None
+            self._schedule_ann()
+        logger.info("Embedding gallery loaded: %d embeddings", len(rows))
+
+    def _schedule_ann(self) -> None:
+        """Wake the ANN maintenance thread, starting it on first use (lock held)."""
+        if len(self._snapshot.row_ids) < ANN_MIN_GALLERY_SIZE or not ann_available():
+            self._ann = self._ann_pending = None
+            return
+        self._ann_wake.set()
+        if self._ann_thread is None:
+            self._ann_thread = threading.Thread(target=self._maintain_ann, name="ann-index", daemon=True)
+            self._ann_thread.start()
+
+    def _maintain_ann(self) -> None:
+        while True:
+            self._ann_wake.wait()
+            self._ann_wake.clear()
+            try:
+                self._update_ann()
+            except Exception:
+                logger.exception("ANN index update failed — using exact search")
+
+    def _update_ann(self) -> None:
+        """Load, build or reconcile the index for the current snapshot without holding the lock."""
+        with self._lock:
+            snapshot, signature, index = self._snapshot, self._signature, self._ann_pending
+        if len(snapshot.row_ids) < ANN_MIN_GALLERY_SIZE:
+            return
+
+        built = False
+        if index is None or index.dim != snapshot.matrix.shape[1]:
+            index = HnswIndex(snapshot.matrix.shape[1])
+            if not index.load(ANN_INDEX_PATH, signature):
+                index.build(snapshot.matrix, snapshot.row_ids, snapshot.trainee_ids)
+                built = True
+                logger.info("Built ANN index over %d templates", len(index))
+        else:
+            added, removed = index.reconcile(snapshot.matrix, snapshot.row_ids, snapshot.trainee_ids)
+            logger.info("Reconciled ANN index: %d templates added, %d removed", added, removed)
+
+        with self._lock:
+            if self._snapshot is not snapshot:
+                # Reloaded or edited meanwhile; go round again with what we have
+                self._ann_pending = index
+                self._ann_wake.set()
+                return
+            self._ann, self._ann_pending = index, None
+        if built:
+            index.save(ANN_INDEX_PATH, signature)
+
+    def persist_ann(self) -> None:
+        """Save the ANN index (with incremental changes) so the next start can skip the build."""
+        with self._lock:
+            ann, signature = self._ann, self._signature
+        if ann is not None:
+            ann.save(ANN_INDEX_PATH, signature)
+
+    def sync(self, db: Session) -> None:
+        """Reload if another worker added or removed embeddings since the last load.
+
+        The (count, max id) probe is a single aggregate query, far cheaper than
+        re-reading and parsing every embedding on each scan.
+        """
+        from models import FaceEmbedding
+
+        count, max_id = db.query(func.count(FaceEmbedding.id), func.max(FaceEmbedding.id)).one()
+        if not self._loaded or (count, max_id) != self._signature:
+            self.load(db)
+
+    def add(self, trainee_id: int, templates: list[tuple[int, list[float]]]) -> None:
+        """Add a trainee's (row_id, embedding) templates."""
+        if not templates:
+            return
+        vectors = _normalize(np.asarray([emb for _, emb in templates], dtype=np.float32))
+        with self._lock:
+            if not self._loaded:
+                # Nothing cached yet — the next sync() will pick the rows up with the rest
+                return
+            current = self._snapshot
+            row_ids = [row_id for row_id, _ in templates]
+            self._snapshot = _Snapshot.build(
+                np.vstack([current.matrix, vectors]) if len(current.row_ids) else vectors,
+                np.append(current.trainee_ids, [trainee_id] * len(templates)),
+                np.append(current.row_ids, row_ids),
+            )
+            count, max_id = self._signature
+            added_max = max(int(row_id) for row_id in row_ids)
+            self._signature = (count + len(row_ids), added_max if max_id is None else max(max_id, added_max))
+            if self._ann is not None:
+                self._ann.add(vectors, row_ids, trainee_id)
+            else:
+                self._schedule_ann()
+
+    def remove_trainee(self, trainee_id: int) -> None:
+        with self._lock:
+            self._skipped = {k: v for k, v in self._skipped.items() if v != trainee_id}
+            current = self._snapshot
+            keep = current.trainee_ids != trainee_id
+            if not keep.all():
+                self._snapshot = _Snapshot.build(current.matrix[keep], current.trainee_ids[keep], current.row_ids[keep])
+            self._recompute_signature()
+            if self._ann is not None and not keep.all():
+                self._ann.remove(current.row_ids[~keep].tolist())
+
+    def search(self, embedding: list[float]) -> tuple[int | None, float]:
+        """Return (trainee_id, score) of the best-matching trainee across all their templates."""
+        snapshot = self._snapshot
+        if not len(snapshot.trainee_ids):
+            return None, -1.0
+
+        query = _normalize(np.asarray(embedding, dtype=np.float32).reshape(1, -1))[0]
+
+        ann = self._ann
+        if ann is not None:
+            candidates = ann.candidate_trainees(query)
+            if len(candidates):
+                return self._rescore(snapshot, query, candidates)
+
+        trainee_scores = reduce_templates(snapshot.matrix @ query, snapshot.segment_starts, self._top_k)
+        best = int(np.argmax(trainee_scores))
+        return int(snapshot.trainee_ids[snapshot.segment_starts[best]]), float(trainee_scores[best])
+
+    def _rescore(self, snapshot: _Snapshot, query: np.ndarray, candidates: np.ndarray) -> tuple[int | None, float]:
+        """Exact scores for the ANN candidates' templates only."""
+        segment_trainees = snapshot.trainee_ids[snapshot.segment_starts]
+        segments = np.searchsorted(segment_trainees, candidates)
+        segments = segments[segments < len(segment_trainees)]
+        # Drop candidates that were removed from the snapshot after the index proposed them
+        segments = segments[np.isin(segment_trainees[segments], candidates)]
+        if not len(segments):
+            return None, -1.0
+
+        segment_ends = np.r_[snapshot.segment_starts[1:], len(snapshot.row_ids)]
+        starts, ends = snapshot.segment_starts[segments], segment_ends[segments]
+        positions = np.concatenate([np.arange(start, end) for start, end in zip(starts, ends)])
+        local_starts = np.r_[0, np.cumsum(ends - starts)[:-1]]
+
+        trainee_scores = reduce_templates(snapshot.matrix[positions] @ query, local_starts, self._top_k)
+        best = int(np.argmax(trainee_scores))
+        return int(segment_trainees[segments[best]]), float(trainee_scores[best])
+
+
+gallery = EmbeddingGallery()
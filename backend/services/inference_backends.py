@@ -0,0 +1,221 @@
+"""Interchangeable engines for the InceptionResnetV1 embedding step.
+
+Select one with FACE_BACKEND:
+  eager        plain PyTorch module (reference)
+  torchscript  traced + frozen TorchScript graph
+  onnx         ONNX Runtime CPU session (needs the optional onnxruntime package)
+
+Exported artifacts are cached under $TORCH_HOME/scanin. Before switching a
+deployment, compare the candidate against eager with:
+
+  python -m services.inference_backends --backend onnx --images path/to/faces/
+"""
+import logging
+import os
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FACE_BACKEND = os.getenv("FACE_BACKEND", "eager").lower()
+
+_INPUT_SHAPE = (3, 160, 160)
+
+
+def artifact_dir() -> str:
+    torch_home = os.getenv("TORCH_HOME") or os.path.join(os.path.expanduser("~"), ".cache", "torch")
+    path = os.path.join(torch_home, "scanin")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _artifact_path(kind: str, extension: str) -> str:
+    import torch
+
+    # Exports are only valid for the torch build that produced them
+    version = torch.__version__.replace("+", "_")
+    return os.path.join(artifact_dir(), f"inception_resnet_v1_vggface2_{kind}_{version}.{extension}")
+
+
+def _tmp_path(path: str) -> str:
+    # Per-process name, renamed into place once complete: workers exporting at once never
+    # load each other's half-written file, and a killed export leaves nothing at `path`
+    return f"{path}.{os.getpid()}.tmp"
+
+
+class EmbeddingBackend:
+    name = "base"
+
+    def embed(self, faces) -> np.ndarray:
+        """Map a (N, 3, 160, 160) float tensor of standardised faces to (N, 512) embeddings."""
+        raise NotImplementedError
+
+
+class EagerBackend(EmbeddingBackend):
+    name = "eager"
+
+    def __init__(self, resnet):
+        self._model = resnet
+
+    def embed(self, faces) -> np.ndarray:
+        import torch
+
+        with torch.no_grad():
+            return self._model(faces).numpy()
+
+
+class TorchScriptBackend(EmbeddingBackend):
+    name = "torchscript"
+
+    def __init__(self, resnet):
+        import torch
+
+        path = _artifact_path("torchscript", "pt")
+        if os.path.exists(path):
+            self._model = torch.jit.load(path)
+        else:
+            with torch.no_grad():
+                traced = torch.jit.trace(resnet, torch.zeros(1, *_INPUT_SHAPE))
+            self._model = torch.jit.freeze(traced)
+            tmp = _tmp_path(path)
+            self._model.save(tmp)
+            os.replace(tmp, path)
+            logger.info("Saved TorchScript embedding model to %s", path)
+
+    def embed(self, faces) -> np.ndarray:
+        import torch
+
+        with torch.inference_mode():
+            return self._model(faces).numpy()
+
+
+class OnnxBackend(EmbeddingBackend):
+    name = "onnx"
+
+    def __init__(self, resnet):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise RuntimeError("FACE_BACKEND=onnx requires the onnxruntime package")
+        import torch
+
+        path = _artifact_path("onnx", "onnx")
+        if not os.path.exists(path):
+            tmp = _tmp_path(path)
+            torch.onnx.export(
+                resnet,
+                torch.zeros(1, *_INPUT_SHAPE),
+                tmp,
+                input_names=["faces"],
+                output_names=["embeddings"],
+                dynamic_axes={"faces": {0: "batch"}, "embeddings": {0: "batch"}},
+                opset_version=17,
+            )
+            os.replace(tmp, path)
+            logger.info("Exported ONNX embedding model to %s", path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self._session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+
+    def embed(self, faces) -> np.ndarray:
+        return self._session.run(None, {"faces": faces.numpy()})[0]
+
+
+BACKENDS: dict[str, type[EmbeddingBackend]] = {
+    backend.name: backend
+    for backend in (EagerBackend, TorchScriptBackend, OnnxBackend)
+}
+
+
+def build_backend(name: str, resnet) -> EmbeddingBackend:
+    """Build the named backend, falling back to eager so a bad export never takes scans down."""
+    backend_cls = BACKENDS.get(name)
+    if backend_cls is None:
+        logger.error("Unknown FACE_BACKEND %r — using eager", name)
+        return EagerBackend(resnet)
+    try:
+        return backend_cls(resnet)
+    except Exception:
+        logger.exception("Could not build %s embedding backend — using eager", name)
+        return EagerBackend(resnet)
+
+
+def compare_backends(reference: EmbeddingBackend, candidate: EmbeddingBackend, faces, threshold: float) -> dict:
+    """Accuracy regression between two backends on the same face crops.
+
+    Reports per-face embedding drift and how many pairwise same/different-person
+    decisions at the given similarity threshold flip relative to the reference.
+    """
+    ref = reference.embed(faces)
+    cand = candidate.embed(faces)
+
+    ref_unit = ref / np.linalg.norm(ref, axis=1, keepdims=True)
+    cand_unit = cand / np.linalg.norm(cand, axis=1, keepdims=True)
+    self_similarity = np.sum(ref_unit * cand_unit, axis=1)
+
+    pairs = np.triu_indices(len(faces), k=1)
+    ref_match = (ref_unit @ ref_unit.T)[pairs] >= threshold
+    cand_match = (cand_unit @ cand_unit.T)[pairs] >= threshold
+
+    return {
+        "faces": len(faces),
+        "max_abs_diff": float(np.max(np.abs(ref - cand))),
+        "min_cosine_to_reference": float(np.min(self_similarity)),
+        "pairs": int(len(ref_match)),
+        "decision_flips": int(np.sum(ref_match != cand_match)),
+    }
+
+
+def _load_faces(image_dir: str | None, count: int):
+    import base64
+
+    import torch
+
+    if not image_dir:
+        logger.warning("No --images given — comparing on random tensors (numerics only)")
+        return torch.randn(count, *_INPUT_SHAPE)
+
+    from services.face_service import _detect_faces
+
+    frames = []
+    for filename in sorted(os.listdir(image_dir)):
+        if filename.lower().endswith((".jpg", ".jpeg", ".png")):
+            with open(os.path.join(image_dir, filename), "rb") as f:
+                frames.append(base64.b64encode(f.read()).decode())
+    faces = [face for face in _detect_faces(frames) if face is not None]
+    if not faces:
+        raise SystemExit(f"No faces detected in {image_dir}")
+    return torch.stack(faces)
+
+
+def main() -> None:
+    import argparse
+    import json
+    import time
+
+    from services.model_registry import model_registry
+
+    parser = argparse.ArgumentParser(description="Compare an embedding backend against eager PyTorch")
+    parser.add_argument("--backend", required=True, choices=sorted(BACKENDS))
+    parser.add_argument("--images", help="directory of face photos (JPEG/PNG)")
+    parser.add_argument("--threshold", type=float, default=0.75)
+    parser.add_argument("--random", type=int, default=32, help="random inputs when --images is omitted")
+    args = parser.parse_args()
+
+    faces = _load_faces(args.images, args.random)
+    reference = EagerBackend(model_registry.resnet)
+    candidate = BACKENDS[args.backend](model_registry.resnet)
+
+    report = compare_backends(reference, candidate, faces, args.threshold)
+    for label, backend in (("eager_seconds", reference), (f"{args.backend}_seconds", candidate)):
+        backend.embed(faces)
+        started = time.perf_counter()
+        backend.embed(faces)
+        report[label] = round(time.perf_counter() - started, 4)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Torch releases the GIL inside its kernels, so a thread pool keeps the event loop free
+# without paying for a second copy of the model per process.
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "1"))
+# Frames allowed to wait for a free worker before new requests are turned away
+INFERENCE_MAX_QUEUE = int(os.getenv("INFERENCE_MAX_QUEUE", "8"))
+# Micro-batching: face crops arriving within INFERENCE_MAX_WAIT_MS share one forward pass
+INFERENCE_MAX_BATCH = int(os.getenv("INFERENCE_MAX_BATCH", "8"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "10"))
+
+
+class InferenceBusyError(Exception):
+    """Raised when the inference queue is full and the caller should retry later."""
+
+
+class InferenceExecutor:
+    def __init__(self, workers: int, max_queue: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+        self._capacity = workers + max_queue
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn, *args):
+        """Run fn(*args) on the inference pool, or raise InferenceBusyError if it is saturated."""
+        with self._lock:
+            if self._pending >= self._capacity:
+                raise InferenceBusyError("Face recognition is busy. Please try again in a moment.")
+            self._pending += 1
+
+        future = self._executor.submit(fn, *args)
+        # Released when the work really finishes, even if the awaiting request was cancelled
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class MicroBatcher:
+    """Groups concurrent submissions into one call of batch_fn(items) -> results.
+
+    A batch is dispatched as soon as max_batch items are waiting, or max_wait_ms
+    after the first item arrived — whichever comes first. batch_fn runs on the
+    inference executor and must return one result per item, in order.
+    """
+
+    def __init__(self, batch_fn, executor: InferenceExecutor, max_batch: int, max_wait_ms: float):
+        self._batch_fn = batch_fn
+        self._executor = executor
+        self._max_batch = max(1, max_batch)
+        self._max_wait = max(0.0, max_wait_ms) / 1000
+        self._waiting: list[tuple[object, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._waiting.append((item, future))
+        if len(self._waiting) >= self._max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self._max_wait, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._waiting:
+            batch = self._waiting[:self._max_batch]
+            self._waiting = self._waiting[self._max_batch:]
+            # Callers that gave up while waiting don't need a slot in the forward pass
+            batch = [(item, future) for item, future in batch if not future.done()]
+            if batch:
+                task = asyncio.ensure_future(self._run(batch))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[object, asyncio.Future]]) -> None:
+        try:
+            results = await self._executor.run(self._batch_fn, [item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+inference_executor = InferenceExecutor(INFERENCE_WORKERS, INFERENCE_MAX_QUEUE)
@@ -1,6 +1,11 @@
+import asyncio
 import os
 import logging
+import time
+from collections import deque
+
 import httpx
+import numpy as np
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,10 +13,140 @@ load_dotenv()
 logger = logging.getLogger(__name__)
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
-GEMINI_URL = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash-lite:generateContent?key={GEMINI_API_KEY}"
+# Point at a local fake server in tests, e.g. GEMINI_BASE_URL=http://127.0.0.1:8081
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com").rstrip("/")
+GEMINI_URL = f"{GEMINI_BASE_URL}/v1beta/models/gemini-2.5-flash-lite:generateContent?key={GEMINI_API_KEY}"
+
+# Total time a scan may spend waiting on Gemini before failing open
+LIVENESS_TIMEOUT_SECONDS = float(os.getenv("LIVENESS_TIMEOUT_SECONDS", "4"))
+# Consecutive failures that open the breaker, and how long it then skips the remote call
+LIVENESS_BREAKER_THRESHOLD = int(os.getenv("LIVENESS_BREAKER_THRESHOLD", "3"))
+LIVENESS_BREAKER_COOLDOWN_SECONDS = float(os.getenv("LIVENESS_BREAKER_COOLDOWN_SECONDS", "30"))
+
+
+class CircuitBreaker:
+    """Closed → open after `threshold` consecutive failures → half-open after `cooldown`.
+
+    While open, calls are skipped. In half-open a single trial call is let through;
+    its outcome closes the breaker again or restarts the cooldown.
+    """
+
+    def __init__(self, threshold: int, cooldown: float):
+        self._threshold = threshold
+        self._cooldown = cooldown
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self._cooldown:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def abandon_trial(self) -> None:
+        """The trial call was cancelled before it finished — let the next call try instead."""
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        self._trial_in_flight = False
+        if self._opened_at is not None or self._failures >= self._threshold:
+            if self._opened_at is None:
+                logger.warning("Gemini liveness breaker opened after %d failures", self._failures)
+            self._opened_at = time.monotonic()
+
+
+class LivenessMetrics:
+    def __init__(self, window: int = 200):
+        self.calls = 0
+        self.failures = 0
+        self.skipped = 0
+        self._latencies: deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float, ok: bool) -> None:
+        self.calls += 1
+        if not ok:
+            self.failures += 1
+        self._latencies.append(seconds)
+
+    def snapshot(self) -> dict:
+        latencies = np.array(self._latencies) * 1000 if self._latencies else None
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "skipped_by_breaker": self.skipped,
+            "breaker_state": _breaker.state,
+            "latency_ms_p50": round(float(np.percentile(latencies, 50)), 1) if latencies is not None else None,
+            "latency_ms_p95": round(float(np.percentile(latencies, 95)), 1) if latencies is not None else None,
+        }
+
+
+_breaker = CircuitBreaker(LIVENESS_BREAKER_THRESHOLD, LIVENESS_BREAKER_COOLDOWN_SECONDS)
+_metrics = LivenessMetrics()
+_client: httpx.AsyncClient | None = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _get_client() -> httpx.AsyncClient:
+    # One pooled client per worker so scans reuse the TCP+TLS connection to Gemini
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            http2=_http2_available(),
+            timeout=httpx.Timeout(LIVENESS_TIMEOUT_SECONDS, connect=min(2.0, LIVENESS_TIMEOUT_SECONDS)),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=120),
+        )
+    return _client
+
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+def get_liveness_metrics() -> dict:
+    return _metrics.snapshot()
 
 
 async def check_liveness(base64_image: str) -> bool:
+    # Fail open: an unreachable Gemini must not lock trainees out of the kiosk
+    verdict = await check_liveness_remote(base64_image)
+    return True if verdict is None else verdict
+
+
+async def check_liveness_remote(base64_image: str) -> bool | None:
+    """Ask Gemini whether the frame shows a live person; None if no answer was available."""
+    if not _breaker.allow():
+        _metrics.skipped += 1
+        logger.debug("Gemini liveness breaker open — skipping remote check")
+        return None
+
     payload = {
         "contents": [
             {
@@ -28,19 +163,34 @@ async def check_liveness(base64_image: str) -> bool:
         ]
     }
 
+    started = time.perf_counter()
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(GEMINI_URL, json=payload)
+        # wait_for bounds the whole call; httpx timeouts only bound each phase
+        response = await asyncio.wait_for(_get_client().post(GEMINI_URL, json=payload), LIVENESS_TIMEOUT_SECONDS)
 
         if response.status_code != 200:
             logger.warning("Gemini API error %s: %s", response.status_code, response.text[:200])
-            return True
+            _breaker.record_failure()
+            _metrics.observe(time.perf_counter() - started, ok=False)
+            return None
 
         result = response.json()
         answer = result["candidates"][0]["content"]["parts"][0]["text"].strip().lower()
         is_live = "yes" in answer
+        _breaker.record_success()
+        _metrics.observe(time.perf_counter() - started, ok=True)
         logger.debug("Gemini says: %r → live=%s", answer, is_live)
         return is_live
+    except asyncio.CancelledError:
+        _breaker.abandon_trial()
+        raise
+    except asyncio.TimeoutError:
+        logger.warning("Gemini liveness check exceeded the %.1fs budget", LIVENESS_TIMEOUT_SECONDS)
+        _breaker.record_failure()
+        _metrics.observe(time.perf_counter() - started, ok=False)
+        return None
     except Exception as e:
         logger.error("Exception during liveness check: %s", e)
-        return True
+        _breaker.record_failure()
+        _metrics.observe(time.perf_counter() - started, ok=False)
+        return None
@@ -0,0 +1,245 @@
+"""CPU-only first-tier anti-spoofing on the MTCNN face crop.
+
+Scores three cues that separate a live face at the kiosk from a printed photo
+or a phone/monitor replay:
+
+  texture   live skin under webcam noise has more fine detail than a re-imaged print
+  moiré     screens re-photographed by a camera show sharp periodic peaks in the spectrum
+  colour    prints and screens compress the saturation range of skin tones
+
+The cues are combined with a logistic model into P(live). In "tiered" mode,
+frames scoring outside the LOCAL_LIVENESS_SPOOF_BELOW / LOCAL_LIVENESS_LIVE_ABOVE
+band are decided locally and the rest are escalated to the Gemini check.
+
+The built-in weights are hand-tuned starting values, not fitted to data, so the
+tier is off by default. Collect live and spoof photos from your own kiosk camera
+(shadow mode logs the local score next to Gemini's verdict) and fit weights and
+a band with:
+
+  python -m services.local_liveness --live path/to/live/ --spoof path/to/spoof/ --out liveness.json
+
+then point LOCAL_LIVENESS_WEIGHTS at the file and set the band it prints.
+"""
+import json
+import logging
+import os
+from collections import Counter
+from dataclasses import dataclass
+
+import numpy as np
+
+# "off": always ask Gemini; "shadow": also score locally and log it, but Gemini decides;
+# "tiered": decide clear cases locally and escalate the rest
+LOCAL_LIVENESS = os.getenv("LOCAL_LIVENESS", "off").lower()
+LOCAL_LIVENESS_SPOOF_BELOW = float(os.getenv("LOCAL_LIVENESS_SPOOF_BELOW", "0.05"))
+LOCAL_LIVENESS_LIVE_ABOVE = float(os.getenv("LOCAL_LIVENESS_LIVE_ABOVE", "0.95"))
+# In "tiered" mode, let the local score decide escalated frames while Gemini is unavailable
+# instead of failing open like the plain Gemini check
+LOCAL_LIVENESS_OUTAGE_FALLBACK = os.getenv("LOCAL_LIVENESS_OUTAGE_FALLBACK", "false").lower() == "true"
+
+# JSON written by the calibration tool below; empty uses the built-in weights
+LOCAL_LIVENESS_WEIGHTS = os.getenv("LOCAL_LIVENESS_WEIGHTS", "")
+
+logger = logging.getLogger(__name__)
+
+FEATURES = ("texture", "moire", "saturation")
+# Typical values for a live 160x160 webcam crop; features are measured relative to them
+_REF_TEXTURE = np.log(60.0)
+_REF_MOIRE = np.log(6.0)
+
+
+@dataclass
+class LivenessModel:
+    """Logistic model over features(): P(live) = sigmoid(bias + weights · features)."""
+
+    bias: float
+    weights: np.ndarray
+
+    def probability(self, x: np.ndarray) -> np.ndarray:
+        return 1 / (1 + np.exp(-(self.bias + x @ self.weights)))
+
+    def to_json(self) -> dict:
+        return {"bias": self.bias, "weights": dict(zip(FEATURES, self.weights.tolist()))}
+
+    @classmethod
+    def from_json(cls, data: dict) -> "LivenessModel":
+        return cls(float(data["bias"]), np.array([float(data["weights"][name]) for name in FEATURES]))
+
+
+# Hand-tuned starting point, used until LOCAL_LIVENESS_WEIGHTS names a fitted model
+DEFAULT_MODEL = LivenessModel(-1.5, np.array([1.1, -1.8, 9.0]))
+
+
+def _load_model(path: str) -> LivenessModel:
+    if not path:
+        return DEFAULT_MODEL
+    with open(path) as f:
+        return LivenessModel.from_json(json.load(f))
+
+
+model = _load_model(LOCAL_LIVENESS_WEIGHTS)
+
+# How local verdicts were reached, for /metrics
+decision_counts: Counter = Counter()
+
+
+@dataclass
+class LocalVerdict:
+    live_probability: float
+    # True / False when the score is outside the uncertainty band, None to escalate
+    decision: bool | None
+
+
+def _to_pixels(face) -> np.ndarray:
+    """Undo MTCNN's fixed_image_standardization: (3, H, W) tensor → (H, W, 3) floats in 0–255."""
+    array = face.numpy() if hasattr(face, "numpy") else np.asarray(face)
+    return np.clip(array.transpose(1, 2, 0) * 128.0 + 127.5, 0, 255)
+
+
+def _texture_energy(gray: np.ndarray) -> float:
+    laplacian = (
+        gray[1:-1, :-2] + gray[1:-1, 2:] + gray[:-2, 1:-1] + gray[2:, 1:-1] - 4 * gray[1:-1, 1:-1]
+    )
+    return float(laplacian.var())
+
+
+def _moire_peak_ratio(gray: np.ndarray) -> float:
+    spectrum = np.abs(np.fft.fftshift(np.fft.fft2(gray - gray.mean())))
+    h, w = spectrum.shape
+    yy, xx = np.ogrid[:h, :w]
+    radius = np.hypot((yy - h / 2) / (h / 2), (xx - w / 2) / (w / 2))
+    # Mid/high frequencies, where screen pixel grids alias into the camera image
+    band = spectrum[(radius > 0.3) & (radius < 0.9)]
+    return float(band.max() / (np.median(band) + 1e-6))
+
+
+def _saturation_spread(rgb: np.ndarray) -> float:
+    high = rgb.max(axis=2)
+    low = rgb.min(axis=2)
+    saturation = (high - low) / (high + 1e-6)
+    return float(np.percentile(saturation, 90) - np.percentile(saturation, 10))
+
+
+def features(face) -> np.ndarray:
+    """(texture, moiré, saturation) for one face crop, relative to a typical live crop."""
+    rgb = _to_pixels(face)
+    gray = rgb @ np.array([0.299, 0.587, 0.114])
+    return np.array([
+        # Clipped so one extreme cue (e.g. a noisy sensor in low light) can't decide alone
+        np.clip(np.log(_texture_energy(gray) + 1e-6) - _REF_TEXTURE, -3, 1.5),
+        np.clip(np.log(_moire_peak_ratio(gray)) - _REF_MOIRE, -1.5, 3),
+        _saturation_spread(rgb),
+    ])
+
+
+def live_probability(face) -> float:
+    return float(model.probability(features(face)))
+
+
+def assess(face) -> LocalVerdict:
+    probability = live_probability(face)
+    if probability >= LOCAL_LIVENESS_LIVE_ABOVE:
+        decision = True
+    elif probability <= LOCAL_LIVENESS_SPOOF_BELOW:
+        decision = False
+    else:
+        decision = None
+    decision_counts[{True: "live", False: "spoof", None: "escalated"}[decision]] += 1
+    return LocalVerdict(probability, decision)
+
+
+def enabled() -> bool:
+    return LOCAL_LIVENESS in ("shadow", "tiered")
+
+
+def shadow() -> bool:
+    return LOCAL_LIVENESS == "shadow"
+
+
+def fit(x: np.ndarray, live: np.ndarray, l2: float = 1e-2, iterations: int = 50) -> LivenessModel:
+    """Fit the logistic model to feature rows and live (1) / spoof (0) labels by Newton's method.
+
+    The small L2 penalty keeps the weights finite when the classes separate perfectly.
+    """
+    design = np.hstack([np.ones((len(x), 1)), x])
+    theta = np.zeros(design.shape[1])
+    penalty = l2 * np.eye(len(theta))
+    penalty[0, 0] = 0  # don't shrink the bias
+    for _ in range(iterations):
+        p = 1 / (1 + np.exp(-(design @ theta)))
+        gradient = design.T @ (p - live) + penalty @ theta
+        hessian = (design * (p * (1 - p))[:, None]).T @ design + penalty
+        step = np.linalg.solve(hessian, gradient)
+        theta -= step
+        if np.max(np.abs(step)) < 1e-8:
+            break
+    return LivenessModel(float(theta[0]), theta[1:])
+
+
+def suggest_band(live_scores: np.ndarray, spoof_scores: np.ndarray, max_error: float) -> tuple[float, float]:
+    """(spoof_below, live_above) so at most max_error of each class is decided wrongly.
+
+    live_above sits above all but max_error of the spoof scores and spoof_below
+    under all but max_error of the live scores; frames in between are escalated.
+    """
+    # With k wrong decisions allowed, the band edges sit just past the (k+1)-th worst score of each class
+    live_above = np.sort(spoof_scores)[::-1][min(int(max_error * len(spoof_scores)), len(spoof_scores) - 1)]
+    spoof_below = np.sort(live_scores)[min(int(max_error * len(live_scores)), len(live_scores) - 1)]
+    live_above = float(min(np.nextafter(live_above, 1.0), 1.0))
+    spoof_below = float(max(np.nextafter(spoof_below, 0.0), 0.0))
+    # Never an inverted band: overlapping classes escalate everything in between
+    return min(spoof_below, live_above), live_above
+
+
+def _load_crops(image_dir: str) -> list:
+    import base64
+
+    from services.face_service import _detect_faces
+
+    frames = []
+    for filename in sorted(os.listdir(image_dir)):
+        if filename.lower().endswith((".jpg", ".jpeg", ".png")):
+            with open(os.path.join(image_dir, filename), "rb") as f:
+                frames.append(base64.b64encode(f.read()).decode())
+    faces = [face for face in _detect_faces(frames) if face is not None]
+    if not faces:
+        raise SystemExit(f"No faces detected in {image_dir}")
+    return faces
+
+
+def main() -> None:
+    """Fit the local liveness weights and band to labelled photos from the kiosk camera."""
+    import argparse
+
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--live", required=True, help="directory of real faces at the kiosk (JPEG/PNG)")
+    parser.add_argument("--spoof", required=True, help="directory of printed-photo and screen replays")
+    parser.add_argument("--max-error", type=float, default=0.01, help="share of each class the band may decide wrongly")
+    parser.add_argument("--out", help="write the fitted model here (for LOCAL_LIVENESS_WEIGHTS)")
+    args = parser.parse_args()
+
+    live_x = np.stack([features(face) for face in _load_crops(args.live)])
+    spoof_x = np.stack([features(face) for face in _load_crops(args.spoof)])
+    fitted = fit(np.vstack([live_x, spoof_x]), np.r_[np.ones(len(live_x)), np.zeros(len(spoof_x))])
+
+    live_scores, spoof_scores = fitted.probability(live_x), fitted.probability(spoof_x)
+    spoof_below, live_above = suggest_band(live_scores, spoof_scores, args.max_error)
+    decided = np.r_[live_scores >= live_above, spoof_scores <= spoof_below].mean()
+    report = {
+        **fitted.to_json(),
+        "samples": {"live": len(live_x), "spoof": len(spoof_x)},
+        "accuracy_at_0.5": float(np.r_[live_scores >= 0.5, spoof_scores < 0.5].mean()),
+        "decided_locally": float(decided),
+        "LOCAL_LIVENESS_SPOOF_BELOW": round(spoof_below, 4),
+        "LOCAL_LIVENESS_LIVE_ABOVE": round(live_above, 4),
+    }
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info("Wrote %s — set LOCAL_LIVENESS_WEIGHTS to it", args.out)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,108 @@
+import logging
+import os
+import threading
+import time
+
+from services.inference_backends import FACE_BACKEND, EmbeddingBackend, build_backend
+
+logger = logging.getLogger(__name__)
+
+# "eager": load and warm up the models in the background as soon as the worker starts
+# "lazy": load on the first scan (faster boot, slower first scan)
+MODEL_LOAD_MODE = os.getenv("MODEL_LOAD_MODE", "eager").lower()
+
+
+class ModelRegistry:
+    """Owns the FaceNet models so importing the app does not pull in torch and the weights."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._mtcnn = None
+        self._resnet = None
+        self._embedder = None
+        self.ready = False
+        self.error: str | None = None
+        # Seconds spent in each loading phase, reported by /ready
+        self.timings: dict[str, float] = {}
+
+    def _timed(self, phase: str, started: float) -> float:
+        now = time.perf_counter()
+        self.timings[phase] = round(now - started, 3)
+        return now
+
+    def _load(self) -> None:
+        with self._lock:
+            if self._resnet is not None:
+                return
+            logger.info("Loading FaceNet model (MTCNN + InceptionResnetV1)...")
+            started = time.perf_counter()
+            from facenet_pytorch import MTCNN, InceptionResnetV1
+            started = self._timed("import_torch", started)
+
+            mtcnn = MTCNN(
+                image_size=160,
+                margin=40,
+                keep_all=False,
+                post_process=True,
+                min_face_size=20,
+                thresholds=[0.5, 0.6, 0.6],
+            )
+            resnet = InceptionResnetV1(pretrained="vggface2").eval()
+            started = self._timed("load_weights", started)
+
+            embedder = build_backend(FACE_BACKEND, resnet)
+            self._timed(f"build_{embedder.name}_backend", started)
+
+            self._mtcnn, self._resnet, self._embedder = mtcnn, resnet, embedder
+            logger.info("FaceNet model loaded.")
+
+    @property
+    def mtcnn(self):
+        if self._mtcnn is None:
+            self._load()
+        return self._mtcnn
+
+    @property
+    def resnet(self):
+        if self._resnet is None:
+            self._load()
+        return self._resnet
+
+    @property
+    def embedder(self) -> EmbeddingBackend:
+        """The configured FACE_BACKEND engine wrapping resnet."""
+        if self._embedder is None:
+            self._load()
+        return self._embedder
+
+    def warmup(self) -> None:
+        """Run one throwaway detection and forward pass so the first real scan isn't slow."""
+        import torch
+        from PIL import Image
+
+        started = time.perf_counter()
+        self.mtcnn.detect(Image.new("RGB", (640, 480)))
+        self.embedder.embed(torch.zeros(1, 3, 160, 160))
+        self._timed("warmup", started)
+
+    def load_and_warmup(self) -> None:
+        try:
+            self._load()
+            self.warmup()
+            self.ready = True
+            logger.info("FaceNet ready: %s", self.timings)
+        except Exception as e:
+            self.error = str(e)
+            logger.exception("Failed to load FaceNet models")
+
+    def start(self) -> None:
+        if MODEL_LOAD_MODE == "lazy":
+            return
+        threading.Thread(target=self.load_and_warmup, name="model-loader", daemon=True).start()
+
+    def is_ready(self) -> bool:
+        # In lazy mode the first scan loads the models, so the worker is ready to take it
+        return self.ready or (MODEL_LOAD_MODE == "lazy" and self.error is None)
+
+
+model_registry = ModelRegistry()
@@ -1,10 +1,14 @@
 import os
 import logging
 import smtplib
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.image import MIMEImage
 from dotenv import load_dotenv
+from sqlalchemy.orm import Session
+
+from models import EmailOutbox
 
 load_dotenv()
 
@@ -17,16 +21,16 @@ SMTP_PASS = os.getenv("SMTP_PASS", "")
 # SMTP_FROM should be a verified sender address in your email provider (e.g. Brevo).
 # If not set, falls back to SMTP_USER.
 SMTP_FROM = os.getenv("SMTP_FROM", "") or SMTP_USER
+SMTP_TIMEOUT_SECONDS = float(os.getenv("SMTP_TIMEOUT_SECONDS", "15"))
+# Reconnect before sending if the session has been idle this long (servers drop idle clients)
+SMTP_IDLE_SECONDS = float(os.getenv("SMTP_IDLE_SECONDS", "60"))
 
 
-def send_email(to: str, subject: str, body: str, image_bytes: bytes | None = None) -> None:
-    if not SMTP_HOST or not SMTP_USER or not SMTP_PASS:
-        logger.debug("SMTP not configured — skipping email to %s", to)
-        return
-    if not SMTP_FROM:
-        logger.debug("SMTP_FROM not set — skipping email to %s", to)
-        return
+def smtp_configured() -> bool:
+    return bool(SMTP_HOST and SMTP_USER and SMTP_PASS and SMTP_FROM)
 
+
+def _build_message(to: str, subject: str, body: str, image_bytes: bytes | None = None) -> MIMEMultipart:
     if image_bytes:
         # related allows referencing the inline image via cid:capture
         msg = MIMEMultipart("related")
@@ -46,14 +50,61 @@ def send_email(to: str, subject: str, body: str, image_bytes: bytes | None = Non
         msg["To"] = to
         msg["Subject"] = subject
         msg.attach(MIMEText(body, "html"))
+    return msg
+
+
+class SmtpSession:
+    """One authenticated SMTP connection reused across messages.
+
+    Reconnects (STARTTLS + login) only when the connection is new, has been idle
+    longer than providers usually keep it, or the server dropped it.
+    """
+
+    def __init__(self, idle_seconds: float = SMTP_IDLE_SECONDS):
+        self._idle_seconds = idle_seconds
+        self._server: smtplib.SMTP | None = None
+        self._last_used = 0.0
 
-    with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
+    def _connect(self) -> None:
+        server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT_SECONDS)
         server.starttls()
         server.login(SMTP_USER, SMTP_PASS)
-        server.sendmail(SMTP_FROM, to, msg.as_string())
+        self._server = server
+
+    def send(self, to: str, subject: str, body: str, image_bytes: bytes | None = None) -> None:
+        msg = _build_message(to, subject, body, image_bytes).as_string()
+        for retry in (False, True):
+            if self._server is None or time.monotonic() - self._last_used > self._idle_seconds:
+                self.close()
+                self._connect()
+            try:
+                self._server.sendmail(SMTP_FROM, to, msg)
+            except smtplib.SMTPServerDisconnected:
+                self.close()
+                if retry:
+                    raise
+                continue
+            self._last_used = time.monotonic()
+            return
+
+    def close(self) -> None:
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
+
+
+def enqueue_email(db: Session, to: str, subject: str, body: str) -> None:
+    """Add an email to the outbox; it is sent once the caller's transaction commits."""
+    if not smtp_configured():
+        logger.debug("SMTP not configured — skipping email to %s", to)
+        return
+    db.add(EmailOutbox(recipient=to, subject=subject, body=body))
 
 
-def alert_admin_absent(admin_email: str, absent_trainees: list[str]) -> None:
+def alert_admin_absent(db: Session, admin_email: str, absent_trainees: list[str]) -> None:
     if not absent_trainees:
         return
 
@@ -65,7 +116,4 @@ def alert_admin_absent(admin_email: str, absent_trainees: list[str]) -> None:
     <p style="color:#888;font-size:12px;">— ScanIn Attendance System</p>
     """
 
-    try:
-        send_email(admin_email, "Absent Trainees Alert", body)
-    except Exception as e:
-        logger.error("Failed to send absent alert email: %s", e)
+    enqueue_email(db, admin_email, "Absent Trainees Alert", body)
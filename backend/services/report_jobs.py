@@ -0,0 +1,207 @@
+"""Background report rendering with artifacts cached per (format, range, data version).
+
+Jobs live in the report_jobs table so any worker can answer a poll; rendering
+runs on a small thread pool in the worker that accepted the submission, and
+artifacts go to REPORT_ARTIFACT_DIR (shared by the workers on one host).
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+from sqlalchemy.orm import Session
+
+from core.data_version import ATTENDANCE_ENTITY, TRAINEES_ENTITY, read_versions
+from database import SessionLocal
+from models import ReportJob
+from services.report_service import FORMATS, count_attendance_rows, render_report
+
+logger = logging.getLogger(__name__)
+
+REPORT_ARTIFACT_DIR = os.getenv("REPORT_ARTIFACT_DIR", "") or os.path.join(os.path.dirname(os.path.dirname(__file__)), "report_artifacts")
+REPORT_JOB_WORKERS = int(os.getenv("REPORT_JOB_WORKERS", "1"))
+# Finished artifacts are deleted after this long, even if the data hasn't changed
+REPORT_ARTIFACT_TTL_HOURS = float(os.getenv("REPORT_ARTIFACT_TTL_HOURS", "24"))
+# A queued/running job not touched for this long is treated as lost (its worker died or restarted)
+REPORT_JOB_STALE_SECONDS = float(os.getenv("REPORT_JOB_STALE_SECONDS", "600"))
+
+_PROGRESS_INTERVAL_SECONDS = 0.5
+# Well inside REPORT_JOB_STALE_SECONDS, so only a job whose process died goes stale
+_HEARTBEAT_SECONDS = min(30.0, REPORT_JOB_STALE_SECONDS / 4)
+
+
+def report_data_version(db: Session) -> str:
+    versions = read_versions(db, ATTENDANCE_ENTITY, TRAINEES_ENTITY)
+    return f"a{versions[ATTENDANCE_ENTITY]}.t{versions[TRAINEES_ENTITY]}"
+
+
+def _is_stale(job: ReportJob) -> bool:
+    return job.status in ("queued", "running") and datetime.utcnow() - job.updated_at > timedelta(seconds=REPORT_JOB_STALE_SECONDS)
+
+
+def job_view(job: ReportJob) -> dict:
+    status, error = job.status, job.error
+    if _is_stale(job):
+        status, error = "failed", "Report generation was interrupted. Please try again."
+    if status == "done":
+        progress = 100
+    else:
+        progress = min(99, int(100 * job.rows_done / job.rows_total)) if job.rows_total else 0
+    return {
+        "id": job.id,
+        "format": job.format,
+        "from": job.from_date,
+        "to": job.to_date,
+        "status": status,
+        "progress": progress,
+        "error": error,
+        "download_url": f"/api/v1/reports/jobs/{job.id}/download" if status == "done" else None,
+    }
+
+
+class ReportJobRunner:
+    def __init__(self, workers: int):
+        self._workers = workers
+        self._executor: ThreadPoolExecutor | None = None
+        # Queued or running in this process; kept fresh by _heartbeat
+        self._owned: set[str] = set()
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="report")
+            threading.Thread(target=self._heartbeat, name="report-heartbeat", daemon=True).start()
+        return self._executor
+
+    def submit(self, db: Session, format: str, from_date: date, to_date: date) -> ReportJob:
+        """Return a job for the report — an existing one if this data was already rendered or is rendering."""
+        if format not in FORMATS:
+            raise ValueError(f"Unknown report format: {format}")
+        self._purge_expired(db)
+
+        version = report_data_version(db)
+        existing = (
+            db.query(ReportJob)
+            .filter(
+                ReportJob.format == format,
+                ReportJob.from_date == from_date,
+                ReportJob.to_date == to_date,
+                ReportJob.data_version == version,
+                ReportJob.status.in_(("queued", "running", "done")),
+            )
+            .order_by(ReportJob.created_at.desc())
+            .first()
+        )
+        if existing is not None and not _is_stale(existing):
+            if existing.status != "done" or (existing.artifact_path and os.path.exists(existing.artifact_path)):
+                return existing
+
+        job = ReportJob(id=uuid.uuid4().hex, format=format, from_date=from_date, to_date=to_date, data_version=version)
+        db.add(job)
+        db.commit()
+        with self._lock:
+            self._owned.add(job.id)
+        self._pool().submit(self._run, job.id)
+        return job
+
+    def _run(self, job_id: str) -> None:
+        db = SessionLocal()
+        try:
+            job = db.query(ReportJob).filter(ReportJob.id == job_id).one()
+            job.status = "running"
+            job.rows_total = count_attendance_rows(db, job.from_date, job.to_date)
+            job.updated_at = datetime.utcnow()
+            db.commit()
+
+            progress_db = SessionLocal()
+            last_update = time.monotonic()
+
+            def on_progress(rows_done: int) -> None:
+                # Separate session: the render session is mid-way through a server-side cursor
+                nonlocal last_update
+                if time.monotonic() - last_update < _PROGRESS_INTERVAL_SECONDS:
+                    return
+                last_update = time.monotonic()
+                progress_db.query(ReportJob).filter(ReportJob.id == job_id).update(
+                    {ReportJob.rows_done: rows_done, ReportJob.updated_at: datetime.utcnow()}
+                )
+                progress_db.commit()
+
+            os.makedirs(REPORT_ARTIFACT_DIR, exist_ok=True)
+            path = os.path.join(REPORT_ARTIFACT_DIR, f"{job_id}.{FORMATS[job.format][0]}")
+            tmp = f"{path}.tmp"
+            started = time.perf_counter()
+            try:
+                render_report(db, job.format, job.from_date, job.to_date, tmp, on_progress)
+            finally:
+                progress_db.close()
+            os.replace(tmp, path)
+
+            job.status = "done"
+            job.rows_done = job.rows_total
+            job.artifact_path = path
+            job.updated_at = datetime.utcnow()
+            db.commit()
+            logger.info("Rendered %s report %s (%d rows) in %.1fs", job.format, job_id, job.rows_total, time.perf_counter() - started)
+        except Exception as e:
+            logger.exception("Report job %s failed", job_id)
+            db.rollback()
+            db.query(ReportJob).filter(ReportJob.id == job_id).update(
+                {ReportJob.status: "failed", ReportJob.error: str(e)[:500], ReportJob.updated_at: datetime.utcnow()}
+            )
+            db.commit()
+        finally:
+            db.close()
+            with self._lock:
+                self._owned.discard(job_id)
+
+    def _heartbeat(self) -> None:
+        """Touch every job this process owns, so only jobs whose process died go stale.
+
+        Progress alone can't show a job is alive: it waits in the queue behind other
+        renders, and no rows arrive while reportlab lays out the PDF or openpyxl zips
+        the workbook.
+        """
+        while not self._stopping.wait(_HEARTBEAT_SECONDS):
+            with self._lock:
+                owned = list(self._owned)
+            if not owned:
+                continue
+            db = SessionLocal()
+            try:
+                db.query(ReportJob).filter(ReportJob.id.in_(owned)).update(
+                    {ReportJob.updated_at: datetime.utcnow()}, synchronize_session=False
+                )
+                db.commit()
+            except Exception as e:
+                logger.warning("Report job heartbeat failed: %s", e)
+            finally:
+                db.close()
+
+    @staticmethod
+    def _purge_expired(db: Session) -> None:
+        cutoff = datetime.utcnow() - timedelta(hours=REPORT_ARTIFACT_TTL_HOURS)
+        expired = db.query(ReportJob).filter(ReportJob.updated_at < cutoff).all()
+        for job in expired:
+            if job.status in ("queued", "running") and not _is_stale(job):
+                continue
+            if job.artifact_path:
+                try:
+                    os.remove(job.artifact_path)
+                except FileNotFoundError:
+                    pass
+            db.delete(job)
+        if expired:
+            db.commit()
+
+    def shutdown(self) -> None:
+        self._stopping.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+report_jobs = ReportJobRunner(REPORT_JOB_WORKERS)
@@ -0,0 +1,186 @@
+import csv
+from datetime import date
+from typing import Callable, Iterable, Iterator
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from models import Attendance, Trainee
+
+HEADERS = ["Name", "Date", "Check-in", "Check-out", "Status"]
+# Rows fetched per round trip; an export holds about this many rows in memory at once
+EXPORT_CHUNK_ROWS = 1000
+# Rows per PDF table; reportlab lays out each table as a whole, so long ranges are split
+PDF_ROWS_PER_TABLE = 200
+
+FORMATS = {
+    "excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": ("csv", "text/csv; charset=utf-8"),
+    "pdf": ("pdf", "application/pdf"),
+}
+
+
+def report_filename(format: str, from_date: date, to_date: date) -> str:
+    return f"attendance_{from_date.strftime('%Y%m%d')}_{to_date.strftime('%Y%m%d')}.{FORMATS[format][0]}"
+
+
+def _in_range(from_date: date, to_date: date):
+    return (Attendance.date >= from_date, Attendance.date <= to_date)
+
+
+def count_attendance_rows(db: Session, from_date: date, to_date: date) -> int:
+    return db.execute(select(func.count(Attendance.id)).where(*_in_range(from_date, to_date))).scalar()
+
+
+def iter_attendance_rows(db: Session, from_date: date, to_date: date) -> Iterator[list[str]]:
+    """Yield report rows (in HEADERS order) through a server-side cursor."""
+    query = (
+        select(
+            func.coalesce(Trainee.unique_name, "Unknown"),
+            Attendance.date,
+            Attendance.checkin_time,
+            Attendance.checkout_time,
+            Attendance.status,
+        )
+        .outerjoin(Trainee, Trainee.id == Attendance.trainee_id)
+        .where(*_in_range(from_date, to_date))
+        .order_by(Attendance.date.asc(), Attendance.checkin_time.asc())
+    )
+    # stream_results uses a named cursor on Postgres, so rows aren't all buffered client-side
+    result = db.execute(query.execution_options(stream_results=True, yield_per=EXPORT_CHUNK_ROWS))
+    for name, day, checkin, checkout, status in result:
+        yield [
+            name,
+            str(day),
+            checkin.strftime("%H:%M:%S") if checkin else "",
+            checkout.strftime("%H:%M:%S") if checkout else "",
+            status or "",
+        ]
+
+
+def excel_column_widths(db: Session, from_date: date, to_date: date) -> list[int]:
+    """Widths for HEADERS; only names vary, so one aggregate query replaces re-reading every cell."""
+    longest_name = db.execute(
+        select(func.max(func.length(Trainee.unique_name)))
+        .join(Attendance, Attendance.trainee_id == Trainee.id)
+        .where(*_in_range(from_date, to_date))
+    ).scalar() or 0
+    fixed = {"Date": len("2000-01-01"), "Check-in": len("00:00:00"), "Check-out": len("00:00:00"), "Status": len("present")}
+    return [max(len(header), fixed.get(header, longest_name)) + 3 for header in HEADERS]
+
+
+def write_csv(path: str, rows: Iterable[list[str]]) -> None:
+    # utf-8-sig writes a BOM so Excel opens the file as UTF-8
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADERS)
+        writer.writerows(rows)
+
+
+def write_excel(path: str, rows: Iterable[list[str]], widths: list[int]) -> None:
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
+
+    # Write-only mode streams rows to disk instead of keeping every cell object in memory
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Attendance Report")
+    for col_idx, width in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(col_idx)].width = width
+
+    bold = Font(bold=True)
+    header_cells = []
+    for header in HEADERS:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = bold
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    for row in rows:
+        ws.append(row)
+    wb.save(path)
+
+
+def write_pdf(path: str, rows: Iterable[list[str]], from_date: date, to_date: date) -> None:
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet
+
+    doc = SimpleDocTemplate(path, pagesize=A4)
+    styles = getSampleStyleSheet()
+    elements = []
+
+    elements.append(Paragraph(f"Attendance Report: {from_date} to {to_date}", styles["Title"]))
+    elements.append(Spacer(1, 20))
+
+    base_style = [
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1f2937")),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, -1), 9),
+        ("BOTTOMPADDING", (0, 0), (-1, 0), 12),
+        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#f9fafb")]),
+    ]
+    status_colors = {
+        "present": colors.HexColor("#dcfce7"),
+        "late": colors.HexColor("#fef9c3"),
+        "absent": colors.HexColor("#fee2e2"),
+    }
+    # Fixed widths so every chunk lines up as one continuous table
+    col_widths = [150, 80, 70, 70, 70]
+
+    def table(chunk: list[list[str]]) -> Table:
+        style_cmds = list(base_style)
+        for i, row in enumerate(chunk):
+            bg = status_colors.get(row[4].lower())
+            if bg:
+                style_cmds.append(("BACKGROUND", (0, i + 1), (-1, i + 1), bg))
+        # repeatRows keeps the header on every page the chunk spills onto
+        t = Table([HEADERS] + chunk, colWidths=col_widths, repeatRows=1)
+        t.setStyle(TableStyle(style_cmds))
+        return t
+
+    chunk: list[list[str]] = []
+    written = 0
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == PDF_ROWS_PER_TABLE:
+            elements.append(table(chunk))
+            written += len(chunk)
+            chunk = []
+    if chunk or not written:
+        elements.append(table(chunk or [["No records", "", "", "", ""]]))
+
+    doc.build(elements)
+
+
+def _counting(rows: Iterable[list[str]], on_progress: Callable[[int], None], every: int = 500) -> Iterator[list[str]]:
+    count = 0
+    for row in rows:
+        yield row
+        count += 1
+        if count % every == 0:
+            on_progress(count)
+
+
+def render_report(
+    db: Session, format: str, from_date: date, to_date: date, path: str,
+    on_progress: Callable[[int], None] | None = None,
+) -> None:
+    """Write the attendance report for the range to `path` in the given format."""
+    rows = iter_attendance_rows(db, from_date, to_date)
+    if on_progress is not None:
+        rows = _counting(rows, on_progress)
+
+    if format == "csv":
+        write_csv(path, rows)
+    elif format == "excel":
+        write_excel(path, rows, excel_column_widths(db, from_date, to_date))
+    elif format == "pdf":
+        write_pdf(path, rows, from_date, to_date)
+    else:
+        raise ValueError(f"Unknown report format: {format}")
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+
+from services import local_liveness
+from services.face_service import detect_face, embed_face, get_embedding
+from services.inference_service import inference_executor
+from services.liveness_service import check_liveness, check_liveness_remote
+
+logger = logging.getLogger(__name__)
+
+LIVENESS_FAILED = "Liveness check failed. Please look at the camera naturally."
+
+
+class ScanRejected(ValueError):
+    """The frame can't be used for attendance; the message is safe to show on the kiosk."""
+
+
+@dataclass
+class ScanResult:
+    embedding: list[float]
+    # None when liveness checking was not requested
+    is_live: bool | None
+
+
+async def scan_frame(frame: str, check_live: bool) -> ScanResult:
+    """Run the liveness check and embedding extraction for one kiosk frame concurrently.
+
+    Latency is roughly max(liveness, embedding) instead of their sum. Whichever
+    stage rejects the frame first cancels the other: a failed liveness check
+    discards the pending embedding, and "no face" cancels the pending Gemini call.
+    With LOCAL_LIVENESS on ("shadow" or "tiered"), see _scan_tiered instead.
+    """
+    if check_live and local_liveness.enabled():
+        return await _scan_tiered(frame)
+
+    embed_task = asyncio.create_task(get_embedding(frame))
+    live_task = asyncio.create_task(check_liveness(frame)) if check_live else None
+    pending = {task for task in (embed_task, live_task) if task is not None}
+
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            if live_task in done and not live_task.result():
+                raise ScanRejected(LIVENESS_FAILED)
+            if embed_task in done and embed_task.exception() is not None:
+                error = embed_task.exception()
+                if isinstance(error, ValueError):
+                    raise ScanRejected(str(error)) from error
+                raise error
+    finally:
+        for task in pending:
+            task.cancel()
+        # Mark outcomes we stopped looking at as retrieved so asyncio doesn't log them
+        for task in (embed_task, live_task):
+            if task is not None and task.done() and not task.cancelled():
+                task.exception()
+
+    return ScanResult(
+        embedding=embed_task.result(),
+        is_live=live_task.result() if live_task is not None else None,
+    )
+
+
+async def _scan_tiered(frame: str) -> ScanResult:
+    """Decide clear cases with the local classifier and only ask Gemini about the rest.
+
+    The local check needs the face crop, so detection runs first; the embedding
+    then overlaps the local check and, for escalated frames, the Gemini call.
+    In shadow mode every frame goes to Gemini and the local verdict is only logged.
+    When Gemini is unavailable the scan fails open, as check_liveness does, unless
+    LOCAL_LIVENESS_OUTAGE_FALLBACK lets the local score decide.
+    """
+    try:
+        face = await detect_face(frame)
+    except ValueError as error:
+        raise ScanRejected(str(error)) from error
+
+    embed_task = asyncio.create_task(embed_face(face))
+    try:
+        # FFT and image statistics are CPU-bound; keep them off the event loop like detection
+        verdict = await inference_executor.run(local_liveness.assess, face)
+        if local_liveness.shadow():
+            is_live = await check_liveness_remote(frame)
+            logger.info("Local liveness score %.2f (local %s, Gemini %s)", verdict.live_probability, verdict.decision, is_live)
+            if verdict.decision is not None and is_live is not None and verdict.decision != is_live:
+                local_liveness.decision_counts["shadow_disagreed"] += 1
+        else:
+            is_live = verdict.decision
+            if is_live is None:
+                is_live = await check_liveness_remote(frame)
+                if is_live is None and local_liveness.LOCAL_LIVENESS_OUTAGE_FALLBACK:
+                    is_live = verdict.live_probability >= 0.5
+                    logger.info("Gemini unavailable — local liveness score %.2f decided", verdict.live_probability)
+        if is_live is None:
+            is_live = True  # Gemini unavailable: fail open
+        if not is_live:
+            raise ScanRejected(LIVENESS_FAILED)
+        return ScanResult(embedding=await embed_task, is_live=True)
+    finally:
+        if not embed_task.done():
+            embed_task.cancel()
+        elif not embed_task.cancelled():
+            embed_task.exception()
@@ -0,0 +1,72 @@
+import logging
+import threading
+from dataclasses import dataclass
+
+from sqlalchemy.orm import Session
+
+from core.data_version import bump, data_versions
+from models import Setting
+
+logger = logging.getLogger(__name__)
+
+SETTINGS_ENTITY = "settings"
+
+
+@dataclass(frozen=True)
+class AppSettings:
+    """Typed view of the settings table; defaults apply to keys that are missing."""
+    work_start_time: str = "09:00"
+    similarity_threshold: float = 0.6
+    grace_period_minutes: int = 10
+    liveness_check_enabled: bool = True
+
+    @classmethod
+    def from_rows(cls, rows: dict[str, str]) -> "AppSettings":
+        values = {}
+        parsers = {
+            "work_start_time": str,
+            "similarity_threshold": float,
+            "grace_period_minutes": int,
+            "liveness_check_enabled": lambda value: value.lower() == "true",
+        }
+        for key, parse in parsers.items():
+            if key not in rows:
+                continue
+            try:
+                values[key] = parse(rows[key])
+            except ValueError:
+                logger.warning("Ignoring invalid value %r for setting %s", rows[key], key)
+        return cls(**values)
+
+
+class SettingsCache:
+    """All settings loaded in one query, reloaded only when the settings version changes."""
+
+    def __init__(self):
+        self._settings: AppSettings | None = None
+        self._version: int | None = None
+        self._lock = threading.Lock()
+
+    def get(self, db: Session) -> AppSettings:
+        version = data_versions.get(db, SETTINGS_ENTITY)
+        settings = self._settings
+        if settings is None or version != self._version:
+            # Query outside the lock, which must never be held across I/O (see VersionTracker.get)
+            settings = AppSettings.from_rows(dict(db.query(Setting.key, Setting.value).all()))
+            with self._lock:
+                if self._version is None or version >= self._version:
+                    self._settings = settings
+                    self._version = version
+        return settings
+
+
+settings_cache = SettingsCache()
+
+
+def get_app_settings(db: Session) -> AppSettings:
+    return settings_cache.get(db)
+
+
+def mark_settings_changed(db: Session) -> None:
+    """Call inside the transaction that writes the settings table."""
+    bump(db, SETTINGS_ENTITY)
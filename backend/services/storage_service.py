@@ -1,16 +1,34 @@
+import asyncio
+import logging
 import os
+import re
+import time
+
 import boto3
 from botocore.config import Config
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 R2_ACCOUNT_ID = os.getenv("R2_ACCOUNT_ID", "")
 R2_ACCESS_KEY_ID = os.getenv("R2_ACCESS_KEY_ID", "")
 R2_SECRET_ACCESS_KEY = os.getenv("R2_SECRET_ACCESS_KEY", "")
 R2_BUCKET_NAME = os.getenv("R2_BUCKET_NAME", "scanin-captures")
 R2_PUBLIC_URL = os.getenv("R2_PUBLIC_URL", "").rstrip("/")
 
+# Captures are written here first and uploaded to R2 in the background; share it between
+# workers on the same host (and mount a volume in Docker so an outage survives restarts)
+CAPTURE_SPOOL_DIR = os.getenv("CAPTURE_SPOOL_DIR", "") or os.path.join(os.path.dirname(os.path.dirname(__file__)), "capture_spool")
+CAPTURE_UPLOAD_CONCURRENCY = int(os.getenv("CAPTURE_UPLOAD_CONCURRENCY", "2"))
+CAPTURE_UPLOAD_MAX_BACKOFF_SECONDS = float(os.getenv("CAPTURE_UPLOAD_MAX_BACKOFF_SECONDS", "300"))
+
+# Served by GET /api/v1/attendance/captures/{filename} until the upload is confirmed
+SPOOL_URL_PREFIX = "/api/v1/attendance/captures"
+
+_CAPTURE_NAME = re.compile(r"^[0-9a-f]{32}\.jpg$")
+
 _s3 = boto3.client(
     "s3",
     endpoint_url=f"https://{R2_ACCOUNT_ID}.r2.cloudflarestorage.com",
@@ -32,6 +50,136 @@ def upload_capture(filename: str, image_bytes: bytes) -> str:
     return f"{R2_PUBLIC_URL}/{filename}"
 
 
-def get_capture_url(filename: str) -> str:
-    """Return the public URL for an already-uploaded capture filename."""
+def public_capture_url(filename: str) -> str:
+    """Return the R2 URL a capture has (or will have) once uploaded — for links that outlive the spool."""
     return f"{R2_PUBLIC_URL}/{filename}"
+
+
+def is_capture_filename(filename: str) -> bool:
+    return _CAPTURE_NAME.match(filename) is not None
+
+
+def spooled_path(filename: str) -> str | None:
+    """Local path of a capture that hasn't been uploaded yet, else None."""
+    if not is_capture_filename(filename):
+        return None
+    path = os.path.join(CAPTURE_SPOOL_DIR, filename)
+    return path if os.path.exists(path) else None
+
+
+def get_capture_url(filename: str) -> str:
+    """Return the URL to display a capture: the local spool until R2 has it, then R2."""
+    if spooled_path(filename):
+        return f"{SPOOL_URL_PREFIX}/{filename}"
+    return public_capture_url(filename)
+
+
+def _spooled_captures() -> list[str]:
+    if not os.path.isdir(CAPTURE_SPOOL_DIR):
+        return []
+    return sorted(name for name in os.listdir(CAPTURE_SPOOL_DIR) if is_capture_filename(name))
+
+
+class CaptureUploader:
+    """Uploads spooled captures to R2 off the request path.
+
+    Failed uploads are retried with exponential backoff for as long as it takes;
+    the spooled file is only deleted once R2 has accepted it. Uploads are
+    idempotent, so a capture picked up by two workers is harmless.
+    """
+
+    def __init__(self, concurrency: int, max_backoff: float):
+        self._concurrency = concurrency
+        self._max_backoff = max_backoff
+        self._queue: asyncio.Queue[tuple[str, int]] | None = None
+        self._tasks: set[asyncio.Task] = set()
+        self.uploaded = 0
+        self.failures = 0
+
+    def spool(self, filename: str, image_bytes: bytes) -> None:
+        """Write the capture to the spool and queue it for upload."""
+        os.makedirs(CAPTURE_SPOOL_DIR, exist_ok=True)
+        path = os.path.join(CAPTURE_SPOOL_DIR, filename)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(image_bytes)
+        # Rename so readers and the startup scan never see a half-written JPEG
+        os.replace(tmp, path)
+        self._enqueue(filename)
+
+    def _enqueue(self, filename: str, attempt: int = 0) -> None:
+        if self._queue is None:
+            # Not started (e.g. a script) — the file stays spooled for the next start
+            return
+        self._queue.put_nowait((filename, attempt))
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue()
+        for _ in range(self._concurrency):
+            self._spawn(self._worker())
+        leftovers = _spooled_captures()
+        if leftovers:
+            logger.info("Re-queueing %d spooled captures left from a previous run", len(leftovers))
+        for name in leftovers:
+            self._enqueue(name)
+
+    async def stop(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._queue = None
+
+    @property
+    def pending(self) -> int:
+        return len(_spooled_captures())
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _worker(self) -> None:
+        while True:
+            filename, attempt = await self._queue.get()
+            try:
+                await self._upload(filename, attempt)
+            except Exception:
+                # e.g. an unreadable spool file; the workers are a fixed pool, so one bad capture mustn't end one
+                logger.exception("Could not upload %s", filename)
+            finally:
+                self._queue.task_done()
+
+    async def _upload(self, filename: str, attempt: int) -> None:
+        path = os.path.join(CAPTURE_SPOOL_DIR, filename)
+        try:
+            with open(path, "rb") as f:
+                image_bytes = f.read()
+        except FileNotFoundError:
+            return  # another worker already uploaded it
+
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(upload_capture, filename, image_bytes)
+        except Exception as e:
+            self.failures += 1
+            delay = min(self._max_backoff, 2 ** min(attempt, 16))
+            logger.warning("Upload of %s failed (attempt %d), retrying in %.0fs: %s", filename, attempt + 1, delay, e)
+            self._spawn(self._retry_later(filename, attempt + 1, delay))
+            return
+
+        self.uploaded += 1
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        logger.debug("Uploaded %s in %.0fms", filename, (time.perf_counter() - started) * 1000)
+
+    async def _retry_later(self, filename: str, attempt: int, delay: float) -> None:
+        await asyncio.sleep(delay)
+        self._enqueue(filename, attempt)
+
+    def metrics(self) -> dict:
+        return {"spooled": self.pending, "uploaded": self.uploaded, "failures": self.failures}
+
+
+capture_uploader = CaptureUploader(CAPTURE_UPLOAD_CONCURRENCY, CAPTURE_UPLOAD_MAX_BACKOFF_SECONDS)
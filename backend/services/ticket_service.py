@@ -0,0 +1,79 @@
+import hashlib
+import logging
+import os
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from jose import JWTError, jwt
+
+from core.ttl_cache import TTLCache
+from dependencies import JWT_ALGORITHM, JWT_SECRET
+
+logger = logging.getLogger(__name__)
+
+# How long the kiosk confirm screen may wait before the scan has to be redone
+IDENTIFY_TICKET_TTL_SECONDS = int(os.getenv("IDENTIFY_TICKET_TTL_SECONDS", "60"))
+
+# Derived key so an identification ticket can never pass as an admin JWT (or vice versa)
+_TICKET_SECRET = hashlib.sha256(f"{JWT_SECRET}:identify-ticket".encode()).hexdigest()
+_TICKET_TYPE = "identify"
+
+# Ticket ids already redeemed by this worker — a ticket records at most one event
+_redeemed = TTLCache(ttl=IDENTIFY_TICKET_TTL_SECONDS, max_size=4096)
+
+
+@dataclass
+class IdentificationTicket:
+    trainee_id: int
+    score: float
+    # None when liveness checking was disabled at identify time
+    is_live: bool | None
+    ticket_id: str
+
+
+def frame_digest(base64_frame: str) -> str:
+    return hashlib.sha256(base64_frame.encode()).hexdigest()
+
+
+def issue_ticket(trainee_id: int, score: float, is_live: bool | None, base64_frame: str) -> str:
+    claims = {
+        "typ": _TICKET_TYPE,
+        "tid": trainee_id,
+        "score": round(score, 4),
+        "live": is_live,
+        "fd": frame_digest(base64_frame),
+        "jti": uuid.uuid4().hex,
+        "exp": datetime.utcnow() + timedelta(seconds=IDENTIFY_TICKET_TTL_SECONDS),
+    }
+    return jwt.encode(claims, _TICKET_SECRET, algorithm=JWT_ALGORITHM)
+
+
+def redeem_ticket(ticket: str, base64_frame: str) -> IdentificationTicket | None:
+    """Validate a ticket issued by /identify for this exact frame and mark it used.
+
+    Returns None for expired, tampered, reused or mismatched tickets so the caller
+    can fall back to a full scan.
+    """
+    try:
+        claims = jwt.decode(ticket, _TICKET_SECRET, algorithms=[JWT_ALGORITHM])
+    except JWTError as e:
+        logger.info("Rejected identification ticket: %s", e)
+        return None
+
+    if claims.get("typ") != _TICKET_TYPE or claims.get("fd") != frame_digest(base64_frame):
+        logger.info("Rejected identification ticket: frame mismatch")
+        return None
+
+    ticket_id = claims["jti"]
+    if ticket_id in _redeemed:
+        logger.info("Rejected identification ticket: already used")
+        return None
+    _redeemed.set(ticket_id, True)
+
+    return IdentificationTicket(
+        trainee_id=claims["tid"],
+        score=claims["score"],
+        is_live=claims["live"],
+        ticket_id=ticket_id,
+    )
@@ -0,0 +1,90 @@
+import os
+import tempfile
+from types import SimpleNamespace
+
+import pytest
+
+# Modules read their settings at import time, so point them at throwaway locations first
+_TMP = tempfile.mkdtemp(prefix="scanin-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP, 'test.db')}"
+os.environ.setdefault("CAPTURE_SPOOL_DIR", os.path.join(_TMP, "capture_spool"))
+os.environ.setdefault("REPORT_ARTIFACT_DIR", os.path.join(_TMP, "report_artifacts"))
+os.environ.setdefault("TORCH_HOME", os.path.join(_TMP, "torch"))
+os.environ.setdefault("R2_ACCOUNT_ID", "test")
+# No R2 in tests: captures stay spooled, and FaceNet only loads if a test scans for real
+os.environ["CAPTURE_UPLOAD_CONCURRENCY"] = "0"
+os.environ["MODEL_LOAD_MODE"] = "lazy"
+# Every request sees the latest data versions, so a write is visible to the next read
+os.environ["DATA_VERSION_POLL_SECONDS"] = "0"
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    main.limiter.enabled = False
+    # Startup creates the tables, runs migrations and seeds the admin and settings
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture
+def db(client):
+    """A session on an empty attendance database (admins and settings stay seeded)."""
+    from database import SessionLocal
+    from models import Attendance, DailySummary, EmailOutbox, FaceEmbedding, ReportJob, Trainee
+
+    session = SessionLocal()
+    for model in (Attendance, FaceEmbedding, DailySummary, EmailOutbox, ReportJob, Trainee):
+        session.query(model).delete()
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def admin_headers():
+    from jose import jwt
+
+    from dependencies import JWT_ALGORITHM, JWT_SECRET
+
+    return {"Authorization": f"Bearer {jwt.encode({'sub': 'admin'}, JWT_SECRET, algorithm=JWT_ALGORITHM)}"}
+
+
+@pytest.fixture
+def kiosk(monkeypatch):
+    """Replace face scanning and matching: every frame is recognised as kiosk.trainee.
+
+    kiosk.scans counts full scans, so tests can tell when a ticket skipped one.
+    """
+    import routers.attendance as attendance_router
+
+    state = SimpleNamespace(trainee=None, scans=0)
+
+    async def scan_frame(frame, check_live):
+        state.scans += 1
+        return SimpleNamespace(embedding=[0.0] * 512, is_live=True if check_live else None)
+
+    def match_face(embedding, db, threshold=None):
+        return (db.merge(state.trainee), 0.9) if state.trainee is not None else (None, 0.0)
+
+    monkeypatch.setattr(attendance_router, "scan_frame", scan_frame)
+    monkeypatch.setattr(attendance_router, "match_face", match_face)
+    return state
+
+
+@pytest.fixture
+def make_trainee(db):
+    from core.data_version import TRAINEES_ENTITY, bump
+    from models import Trainee
+
+    def make(name: str) -> Trainee:
+        trainee = Trainee(unique_name=name, registered_by="admin")
+        db.add(trainee)
+        bump(db, TRAINEES_ENTITY)
+        db.commit()
+        return trainee
+
+    return make
@@ -0,0 +1,58 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from models import Attendance
+from services.attendance_service import _decode_cursor, encode_cursor
+
+
+@pytest.fixture
+def history(db, make_trainee):
+    """Rows over three days, with check-in ties and rows that have no check-in, in history order."""
+    trainees = [make_trainee(f"t{i}") for i in range(4)]
+    rows = []
+    for offset in range(3):
+        day = date(2026, 3, 10) - timedelta(days=offset)
+        same_time = datetime.combine(day, datetime.min.time()).replace(hour=9)
+        for i, trainee in enumerate(trainees):
+            # t0 and t1 check in at the same moment; t3 only has an admin-created row
+            checkin = None if i == 3 else same_time + timedelta(minutes=max(0, i - 1) * 5)
+            rows.append(Attendance(trainee_id=trainee.id, date=day, checkin_time=checkin, status="present"))
+    db.add_all(rows)
+    db.commit()
+
+    def order_key(row):
+        return (row.date, row.checkin_time is not None, row.checkin_time or datetime.min, row.id)
+
+    return [row.id for row in sorted(rows, key=order_key, reverse=True)]
+
+
+def _page_through(client, limit: int) -> list[int]:
+    ids, cursor = [], None
+    while True:
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        body = client.get("/api/v1/attendance/history", params=params).json()
+        ids += [row["id"] for row in body["data"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+@pytest.mark.parametrize("limit", [1, 2, 5, 12, 50])
+def test_pages_cover_every_row_once_in_history_order(client, history, limit):
+    assert _page_through(client, limit) == history
+
+
+def test_cursor_round_trips(db, history):
+    row = db.get(Attendance, history[0])
+    assert _decode_cursor(encode_cursor(row)) == (row.date, row.checkin_time, row.id)
+
+    no_checkin = db.query(Attendance).filter(Attendance.checkin_time.is_(None)).first()
+    assert _decode_cursor(encode_cursor(no_checkin)) == (no_checkin.date, None, no_checkin.id)
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "W10", "WyJ4IiwgbnVsbCwgMV0"])
+def test_malformed_cursor_is_a_400(client, db, cursor):
+    response = client.get("/api/v1/attendance/history", params={"cursor": cursor})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
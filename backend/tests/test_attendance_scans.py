@@ -0,0 +1,65 @@
+from datetime import date, datetime
+
+from models import Attendance, DailySummary
+from services.attendance_service import record_scan
+
+DAY = date(2026, 3, 2)
+
+
+def _scan(db, trainee_id: int, hour: int, image: str):
+    outcome = record_scan(db, trainee_id, DAY, datetime(2026, 3, 2, hour), image, "present")
+    db.commit()
+    return outcome
+
+
+def test_second_scan_of_the_day_becomes_the_checkout(db, make_trainee):
+    trainee = make_trainee("alice")
+
+    checkin = _scan(db, trainee.id, 9, "in.jpg")
+    checkout = _scan(db, trainee.id, 17, "out.jpg")
+
+    assert checkin.action == "checkin"
+    assert checkout.action == "checkout"
+    assert checkout.record_id == checkin.record_id
+    assert checkout.checkin_time == datetime(2026, 3, 2, 9)
+    assert checkout.checkout_time == datetime(2026, 3, 2, 17)
+
+    row = db.query(Attendance).one()
+    assert (row.checkin_image, row.checkout_image, row.status) == ("in.jpg", "out.jpg", "present")
+
+
+def test_third_scan_is_rejected_and_changes_nothing(db, make_trainee):
+    trainee = make_trainee("alice")
+    _scan(db, trainee.id, 9, "in.jpg")
+    _scan(db, trainee.id, 17, "out.jpg")
+
+    assert _scan(db, trainee.id, 18, "again.jpg") is None
+    row = db.query(Attendance).one()
+    assert row.checkout_time == datetime(2026, 3, 2, 17)
+    # Only the check-in counted towards the day's totals
+    summary = db.get(DailySummary, DAY)
+    assert (summary.present, summary.checked_in) == (1, 1)
+
+
+def test_scan_fills_in_an_admin_row_without_checkin(db, make_trainee):
+    trainee = make_trainee("alice")
+    db.add(Attendance(trainee_id=trainee.id, date=DAY, status="present"))
+    db.commit()
+
+    outcome = _scan(db, trainee.id, 9, "in.jpg")
+
+    assert outcome.action == "checkin"
+    assert db.query(Attendance).one().checkout_time is None
+
+
+def test_checkin_endpoint_rejects_a_third_scan(client, db, kiosk, make_trainee):
+    kiosk.trainee = make_trainee("alice")
+
+    first = client.post("/api/v1/attendance/checkin", json={"frame": "ZnJhbWU="})
+    second = client.post("/api/v1/attendance/checkin", json={"frame": "ZnJhbWU="})
+    third = client.post("/api/v1/attendance/checkin", json={"frame": "ZnJhbWU="})
+
+    assert first.json()["data"]["action"] == "checkin"
+    assert second.json()["data"]["action"] == "checkout"
+    assert third.status_code == 400
+    assert third.json()["detail"] == "Already checked in and out today."
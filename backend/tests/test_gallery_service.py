@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from services.gallery_service import EmbeddingGallery, reduce_templates
+
+
+def _naive_reduce(scores: np.ndarray, segment_starts: np.ndarray, top_k: int) -> np.ndarray:
+    ends = list(segment_starts[1:]) + [len(scores)]
+    return np.array([
+        np.mean(sorted(scores[start:end], reverse=True)[:top_k]) for start, end in zip(segment_starts, ends)
+    ])
+
+
+@pytest.mark.parametrize("top_k", [1, 2, 3, 5])
+def test_reduce_templates_matches_naive_on_uneven_segments(top_k):
+    rng = np.random.default_rng(top_k)
+    # Segments of 1, 4, 2, 6 and 3 templates
+    segment_starts = np.array([0, 1, 5, 7, 13])
+    scores = rng.uniform(-1, 1, size=16).astype(np.float32)
+
+    reduced = reduce_templates(scores, segment_starts, top_k)
+
+    assert np.allclose(reduced, _naive_reduce(scores, segment_starts, top_k), atol=1e-6)
+
+
+def test_reduce_templates_averages_all_templates_when_fewer_than_k():
+    scores = np.array([0.9, 0.1, 0.5], dtype=np.float32)
+    reduced = reduce_templates(scores, np.array([0, 1]), top_k=4)
+    assert reduced == pytest.approx([0.9, 0.3])
+
+
+def _gallery(top_k: int = 1) -> EmbeddingGallery:
+    gallery = EmbeddingGallery(top_k=top_k)
+    gallery._loaded = True
+    return gallery
+
+
+def test_search_finds_trainee_with_best_template():
+    gallery = _gallery()
+    gallery.add(1, [(10, [1.0, 0.0, 0.0]), (11, [0.0, 1.0, 0.0])])
+    gallery.add(2, [(12, [0.7, 0.7, 0.0])])
+
+    trainee_id, score = gallery.search([0.0, 2.0, 0.1])
+    assert trainee_id == 1
+    assert score == pytest.approx(2.0 / np.linalg.norm([0.0, 2.0, 0.1]), abs=1e-6)
+
+
+def test_signature_tracks_adds_and_removals():
+    gallery = _gallery()
+    gallery.add(1, [(5, [1.0, 0.0]), (9, [0.0, 1.0])])
+    gallery.add(2, [(7, [1.0, 1.0])])
+    assert gallery._signature == (3, 9)
+
+    gallery.remove_trainee(1)
+    assert gallery._signature == (1, 7)
+    assert gallery.search([1.0, 0.0])[0] == 2
+
+    gallery.remove_trainee(2)
+    assert gallery._signature == (0, None)
+    assert gallery.search([1.0, 0.0]) == (None, -1.0)
@@ -0,0 +1,50 @@
+from core.http_cache import ResponseCache, response_cache
+
+URL = "/api/v1/trainees/public"
+
+
+def test_unchanged_data_revalidates_with_304(client, db, make_trainee):
+    make_trainee("alice")
+
+    first = client.get(URL)
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    assert etag.startswith('W/"')
+
+    revalidated = client.get(URL, headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["ETag"] == etag
+    assert revalidated.content == b""
+
+
+def test_write_changes_the_etag_and_body(client, db, make_trainee):
+    make_trainee("alice")
+    etag = client.get(URL).headers["ETag"]
+
+    make_trainee("bob")
+    response = client.get(URL, headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert [t["unique_name"] for t in response.json()["data"]] == ["alice", "bob"]
+
+
+def test_repeat_request_is_served_from_the_cache(client, db, make_trainee):
+    make_trainee("alice")
+    client.get(URL)
+    hits = response_cache.hits
+
+    assert client.get(URL).json()["data"][0]["unique_name"] == "alice"
+    assert response_cache.hits == hits + 1
+
+
+def test_response_cache_evicts_least_recently_used():
+    cache = ResponseCache(max_entries=2, max_bytes=1024)
+    cache.put(("a",), b"1")
+    cache.put(("b",), b"2")
+    cache.get(("a",))
+    cache.put(("c",), b"3")
+
+    assert cache.get(("b",)) is None
+    assert cache.get(("a",)) == b"1"
+    assert cache.get(("c",)) == b"3"
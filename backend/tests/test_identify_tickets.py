@@ -0,0 +1,39 @@
+from services.ticket_service import issue_ticket, redeem_ticket
+
+FRAME = "ZnJhbWU="
+
+
+def test_ticket_redeems_once():
+    ticket = issue_ticket(7, 0.91, True, FRAME)
+
+    redeemed = redeem_ticket(ticket, FRAME)
+    assert (redeemed.trainee_id, redeemed.score, redeemed.is_live) == (7, 0.91, True)
+    assert redeem_ticket(ticket, FRAME) is None
+
+
+def test_ticket_is_bound_to_its_frame():
+    ticket = issue_ticket(7, 0.91, True, FRAME)
+    assert redeem_ticket(ticket, "b3RoZXI=") is None
+    # A mismatched attempt doesn't use the ticket up
+    assert redeem_ticket(ticket, FRAME) is not None
+
+
+def test_tampered_ticket_is_rejected():
+    ticket = issue_ticket(7, 0.91, True, FRAME)
+    assert redeem_ticket(ticket[:-2] + ("AA" if not ticket.endswith("AA") else "BB"), FRAME) is None
+
+
+def test_checkin_with_ticket_skips_the_scan_once(client, db, kiosk, make_trainee):
+    kiosk.trainee = make_trainee("alice")
+
+    identified = client.post("/api/v1/attendance/identify", json={"frame": FRAME}).json()["data"]
+    assert identified["action"] == "checkin"
+    assert kiosk.scans == 1
+
+    body = {"frame": FRAME, "ticket": identified["ticket"]}
+    assert client.post("/api/v1/attendance/checkin", json=body).json()["data"]["action"] == "checkin"
+    assert kiosk.scans == 1
+
+    # Replaying the same ticket falls back to a full scan
+    assert client.post("/api/v1/attendance/checkout", json=body).json()["data"]["action"] == "checkout"
+    assert kiosk.scans == 2
@@ -0,0 +1,47 @@
+"""Accuracy regression for the exported embedding engines against eager PyTorch."""
+import numpy as np
+import pytest
+
+torch = pytest.importorskip("torch")
+facenet_pytorch = pytest.importorskip("facenet_pytorch")
+
+from services.inference_backends import BACKENDS, EagerBackend, compare_backends
+
+THRESHOLD = 0.75
+
+
+@pytest.fixture(scope="module")
+def resnet():
+    # Random weights keep the test offline; agreement with eager doesn't depend on training
+    torch.manual_seed(0)
+    return facenet_pytorch.InceptionResnetV1(pretrained=None).eval()
+
+
+@pytest.fixture(scope="module")
+def faces():
+    torch.manual_seed(1)
+    return torch.randn(6, 3, 160, 160)
+
+
+@pytest.mark.parametrize("name", sorted(set(BACKENDS) - {"eager"}))
+def test_backend_matches_eager(name, resnet, faces):
+    if name == "onnx":
+        pytest.importorskip("onnxruntime")
+    reference = EagerBackend(resnet)
+    candidate = BACKENDS[name](resnet)
+
+    report = compare_backends(reference, candidate, faces, THRESHOLD)
+
+    assert report["min_cosine_to_reference"] > 0.9999
+    assert report["decision_flips"] == 0
+    assert np.allclose(candidate.embed(faces), reference.embed(faces), atol=1e-3)
+
+
+@pytest.mark.parametrize("name", sorted(set(BACKENDS) - {"eager"}))
+def test_backend_reloads_cached_artifact(name, resnet, faces):
+    if name == "onnx":
+        pytest.importorskip("onnxruntime")
+    first = BACKENDS[name](resnet)
+    # The second build loads the export the first one cached
+    second = BACKENDS[name](resnet)
+    assert np.allclose(first.embed(faces), second.embed(faces), atol=1e-5)
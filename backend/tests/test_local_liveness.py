@@ -0,0 +1,80 @@
+import json
+
+import numpy as np
+import pytest
+
+from services import local_liveness
+
+
+def _face(rgb: np.ndarray) -> np.ndarray:
+    """(H, W, 3) pixels → the (3, H, W) standardised layout MTCNN hands over."""
+    return ((np.clip(rgb, 0, 255) - 127.5) / 128.0).transpose(2, 0, 1)
+
+
+def live_crop(seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[:160, :160]
+    skin = np.stack([200 - 0.3 * yy, 150 - 0.2 * xx + 0 * yy, 120 + 0.1 * xx + 0 * yy], axis=2)
+    skin[..., 2] -= 60 * (xx > 80)  # shadowed cheek: a wide spread of skin saturation
+    return _face(skin + rng.normal(0, 12, size=skin.shape))
+
+
+def screen_crop(seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[:160, :160]
+    # A monitor's pixel grid aliased into the camera image, on washed-out grey
+    grid = 140 + 40 * np.sin(2 * np.pi * xx / 3) * np.sin(2 * np.pi * yy / 3)
+    return _face(np.stack([grid] * 3, axis=2) + rng.normal(0, 1, size=(160, 160, 3)))
+
+
+def test_clear_live_crop_is_decided_live():
+    verdict = local_liveness.assess(live_crop())
+    assert verdict.live_probability >= local_liveness.LOCAL_LIVENESS_LIVE_ABOVE
+    assert verdict.decision is True
+
+
+def test_screen_replay_is_decided_spoof():
+    verdict = local_liveness.assess(screen_crop())
+    assert verdict.live_probability <= local_liveness.LOCAL_LIVENESS_SPOOF_BELOW
+    assert verdict.decision is False
+
+
+def test_scores_inside_the_band_are_escalated(monkeypatch):
+    probability = local_liveness.live_probability(live_crop())
+    monkeypatch.setattr(local_liveness, "LOCAL_LIVENESS_SPOOF_BELOW", probability - 0.01)
+    monkeypatch.setattr(local_liveness, "LOCAL_LIVENESS_LIVE_ABOVE", probability + 0.01)
+
+    verdict = local_liveness.assess(live_crop())
+    assert verdict.decision is None
+
+
+def test_fit_separates_labelled_crops():
+    live = np.stack([local_liveness.features(live_crop(seed)) for seed in range(8)])
+    spoof = np.stack([local_liveness.features(screen_crop(seed)) for seed in range(8)])
+    model = local_liveness.fit(np.vstack([live, spoof]), np.r_[np.ones(8), np.zeros(8)])
+
+    assert model.probability(live).min() > 0.5 > model.probability(spoof).max()
+    assert model.weights[local_liveness.FEATURES.index("moire")] < 0
+
+
+def test_suggest_band_keeps_errors_within_budget():
+    live = np.array([0.2, 0.6, 0.7, 0.8, 0.9, 0.95, 0.97, 0.98, 0.99, 0.99])
+    spoof = np.array([0.01, 0.02, 0.05, 0.1, 0.1, 0.2, 0.3, 0.4, 0.5, 0.75])
+    spoof_below, live_above = local_liveness.suggest_band(live, spoof, max_error=0.1)
+
+    # One wrong decision per class is allowed: the 0.2 live frame and the 0.75 spoof
+    assert 0.2 < spoof_below < 0.6
+    assert 0.5 < live_above < 0.75
+    assert np.mean(spoof >= live_above) <= 0.1
+    assert np.mean(live <= spoof_below) <= 0.1
+    assert spoof_below <= live_above
+
+
+def test_fitted_model_round_trips_through_json(tmp_path):
+    model = local_liveness.LivenessModel(0.5, np.array([1.0, -2.0, 3.0]))
+    path = tmp_path / "liveness.json"
+    path.write_text(json.dumps(model.to_json()))
+
+    loaded = local_liveness._load_model(str(path))
+    assert loaded.bias == pytest.approx(0.5)
+    assert loaded.weights.tolist() == [1.0, -2.0, 3.0]
@@ -1,6 +1,6 @@
 import { useState, useEffect, useRef } from "react";
 import { useNavigate } from "react-router-dom";
-import { getAttendance, getWeeklyAnalytics } from "../services/api";
+import { fetchAllPages, getAttendance, getWeeklyAnalytics } from "../services/api";
 import AttendanceTable from "../components/AttendanceTable";
 import AdminLayout from "../components/AdminLayout";
 import {
@@ -99,8 +99,7 @@ export default function AdminDashboard() {
   const fetchAttendance = async (dateStr) => {
     setLoading(true);
     try {
-      const res = await getAttendance({ date: dateStr });
-      setRecords(res.data.data || []);
+      setRecords(await fetchAllPages(getAttendance, { date: dateStr }));
     } catch (err) {
       if (err.response?.status === 401) {
         localStorage.removeItem("attendance_token");
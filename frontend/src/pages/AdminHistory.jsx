@@ -35,6 +35,8 @@ export default function AdminHistory() {
   const [confirmDelete, setConfirmDelete] = useState(null);
   const [previewImage, setPreviewImage] = useState(null);
   const [page, setPage] = useState(1);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     getTrainees()
@@ -42,26 +44,48 @@ export default function AdminHistory() {
       .catch(() => {});
   }, []);
 
+  const historyParams = () => {
+    const params = {};
+    if (traineeId) params.trainee_id = traineeId;
+    if (fromDate) params.from = fromDate;
+    if (toDate) params.to = toDate;
+    return params;
+  };
+
+  const handleError = (err) => {
+    if (err.response?.status === 401) {
+      localStorage.removeItem("attendance_token");
+      navigate("/admin/login");
+    }
+  };
+
   const fetchHistory = async () => {
     setLoading(true);
     setPage(1);
     try {
-      const params = {};
-      if (traineeId) params.trainee_id = traineeId;
-      if (fromDate) params.from = fromDate;
-      if (toDate) params.to = toDate;
-      const res = await getAttendance(params);
+      const res = await getAttendance(historyParams());
       setRecords(res.data.data || []);
+      setNextCursor(res.data.next_cursor || null);
     } catch (err) {
-      if (err.response?.status === 401) {
-        localStorage.removeItem("attendance_token");
-        navigate("/admin/login");
-      }
+      handleError(err);
     } finally {
       setLoading(false);
     }
   };
 
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const res = await getAttendance({ ...historyParams(), cursor: nextCursor });
+      setRecords((prev) => [...prev, ...(res.data.data || [])]);
+      setNextCursor(res.data.next_cursor || null);
+    } catch (err) {
+      handleError(err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const startEdit = (r) => {
     setEditingId(r.id);
     setEditForm({
@@ -544,6 +568,18 @@ export default function AdminHistory() {
                     </div>
                   </div>
                 )}
+
+                {nextCursor && (
+                  <div className="flex justify-center mt-4">
+                    <button
+                      onClick={loadMore}
+                      disabled={loadingMore}
+                      className={`px-4 py-2 rounded-lg text-sm font-medium transition cursor-pointer disabled:opacity-40 disabled:cursor-not-allowed ${dark ? "bg-gray-800 text-gray-300 hover:bg-gray-700" : "bg-gray-100 text-gray-600 hover:bg-gray-200"}`}
+                    >
+                      {loadingMore ? "Loading…" : "Load older records"}
+                    </button>
+                  </div>
+                )}
               </>
             )}
             {/* Confirm Delete Modal */}
@@ -1,6 +1,10 @@
 import { useState } from "react";
 import { useNavigate } from "react-router-dom";
-import { exportReport } from "../services/api";
+import {
+  downloadReportJob,
+  getReportJob,
+  submitReportJob,
+} from "../services/api";
 import AdminLayout from "../components/AdminLayout";
 import { useDarkMode } from "../contexts/DarkModeContext";
 
@@ -15,6 +19,19 @@ function getWeekRange() {
   return { from: fmt(mon), to: fmt(sun) };
 }
 
+const EXPORT_FORMATS = {
+  excel: {
+    mimeType:
+      "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    extension: "xlsx",
+  },
+  csv: { mimeType: "text/csv", extension: "csv" },
+  pdf: { mimeType: "application/pdf", extension: "pdf" },
+};
+
+const JOB_POLL_MS = 1000;
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
 export default function AdminReports() {
   const { dark } = useDarkMode();
   const navigate = useNavigate();
@@ -22,30 +39,38 @@ export default function AdminReports() {
 
   const [fromDate, setFromDate] = useState(week.from);
   const [toDate, setToDate] = useState(week.to);
-  const [loadingExcel, setLoadingExcel] = useState(false);
-  const [loadingPdf, setLoadingPdf] = useState(false);
+  const [loadingFormat, setLoadingFormat] = useState(null);
+  const [progress, setProgress] = useState(0);
 
   const handleExport = async (format) => {
-    const setLoading = format === "excel" ? setLoadingExcel : setLoadingPdf;
-    setLoading(true);
+    setLoadingFormat(format);
+    setProgress(0);
     try {
-      const res = await exportReport(
+      // The server renders in the background (or reuses an unchanged report); poll until ready
+      let { data } = await submitReportJob(
         format,
         fromDate || undefined,
         toDate || undefined,
       );
-      const mimeType =
-        format === "excel"
-          ? "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-          : "application/pdf";
-      const blob = new Blob([res.data], { type: mimeType });
+      let job = data.data;
+      while (job.status === "queued" || job.status === "running") {
+        setProgress(job.progress);
+        await sleep(JOB_POLL_MS);
+        ({ data } = await getReportJob(job.id));
+        job = data.data;
+      }
+      if (job.status !== "done") {
+        throw new Error(job.error || "Report generation failed");
+      }
+      const res = await downloadReportJob(job.id);
+      const blob = new Blob([res.data], { type: EXPORT_FORMATS[format].mimeType });
       const url = window.URL.createObjectURL(blob);
       const a = document.createElement("a");
       a.style.display = "none";
       a.href = url;
       const f = fromDate.replace(/-/g, "");
       const t = toDate.replace(/-/g, "");
-      a.download = `attendance_${f}_${t}.${format === "excel" ? "xlsx" : "pdf"}`;
+      a.download = `attendance_${f}_${t}.${EXPORT_FORMATS[format].extension}`;
       document.body.appendChild(a);
       a.click();
       setTimeout(() => {
@@ -57,10 +82,10 @@ export default function AdminReports() {
         localStorage.removeItem("attendance_token");
         navigate("/admin/login");
       } else {
-        alert("Export failed.");
+        alert(err.response ? "Export failed." : err.message || "Export failed.");
       }
     } finally {
-      setLoading(false);
+      setLoadingFormat(null);
     }
   };
 
@@ -101,7 +126,7 @@ export default function AdminReports() {
         <div className="flex gap-4">
           <button
             onClick={() => handleExport("excel")}
-            disabled={loadingExcel}
+            disabled={loadingFormat === "excel"}
             className="flex-1 bg-green-600 hover:bg-green-500 disabled:bg-green-800 text-white font-semibold py-2.5 rounded-lg transition cursor-pointer disabled:cursor-not-allowed flex items-center justify-center gap-2"
           >
             <svg
@@ -117,11 +142,31 @@ export default function AdminReports() {
                 d="M3 16.5v2.25A2.25 2.25 0 005.25 21h13.5A2.25 2.25 0 0021 18.75V16.5M16.5 12L12 16.5m0 0L7.5 12m4.5 4.5V3"
               />
             </svg>
-            {loadingExcel ? "Exporting…" : "Excel"}
+            {loadingFormat === "excel" ? `Exporting… ${progress}%` : "Excel"}
+          </button>
+          <button
+            onClick={() => handleExport("csv")}
+            disabled={loadingFormat === "csv"}
+            className="flex-1 bg-sky-600 hover:bg-sky-500 disabled:bg-sky-800 text-white font-semibold py-2.5 rounded-lg transition cursor-pointer disabled:cursor-not-allowed flex items-center justify-center gap-2"
+          >
+            <svg
+              className="w-4 h-4"
+              fill="none"
+              viewBox="0 0 24 24"
+              stroke="currentColor"
+              strokeWidth={2}
+            >
+              <path
+                strokeLinecap="round"
+                strokeLinejoin="round"
+                d="M3 16.5v2.25A2.25 2.25 0 005.25 21h13.5A2.25 2.25 0 0021 18.75V16.5M16.5 12L12 16.5m0 0L7.5 12m4.5 4.5V3"
+              />
+            </svg>
+            {loadingFormat === "csv" ? `Exporting… ${progress}%` : "CSV"}
           </button>
           <button
             onClick={() => handleExport("pdf")}
-            disabled={loadingPdf}
+            disabled={loadingFormat === "pdf"}
             className="flex-1 bg-red-600 hover:bg-red-500 disabled:bg-red-800 text-white font-semibold py-2.5 rounded-lg transition cursor-pointer disabled:cursor-not-allowed flex items-center justify-center gap-2"
           >
             <svg
@@ -137,7 +182,7 @@ export default function AdminReports() {
                 d="M3 16.5v2.25A2.25 2.25 0 005.25 21h13.5A2.25 2.25 0 0021 18.75V16.5M16.5 12L12 16.5m0 0L7.5 12m4.5 4.5V3"
               />
             </svg>
-            {loadingPdf ? "Exporting…" : "PDF"}
+            {loadingFormat === "pdf" ? `Exporting… ${progress}%` : "PDF"}
           </button>
         </div>
 
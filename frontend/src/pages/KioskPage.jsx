@@ -95,7 +95,7 @@ export default function KioskPage() {
     setPhase("recording");
 
     try {
-      const res = await checkin(capturedFrame);
+      const res = await checkin(capturedFrame, identified?.ticket);
       if (res.data.success) {
         setResult(res.data.data);
         setPhase("success");
@@ -120,7 +120,7 @@ export default function KioskPage() {
       playChime("error");
       resetFull(2000);
     }
-  }, [capturedFrame, resetFull]);
+  }, [capturedFrame, identified, resetFull]);
 
   const handleCancel = useCallback(() => {
     setPhase("idle");
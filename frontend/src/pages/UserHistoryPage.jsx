@@ -11,6 +11,8 @@ export default function UserHistoryPage() {
   const [loading, setLoading] = useState(false);
   const [initialLoad, setInitialLoad] = useState(true);
   const [error, setError] = useState("");
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const dropdownRef = useRef(null);
 
   // Load trainee list on mount
@@ -36,28 +38,50 @@ export default function UserHistoryPage() {
     return () => document.removeEventListener("mousedown", handler);
   }, []);
 
+  const historyParams = () => {
+    const params = {};
+    if (selectedName) params.name = selectedName;
+    if (fromDate) params.from = fromDate;
+    if (toDate) params.to = toDate;
+    return params;
+  };
+
+  const showError = (err) =>
+    setError(
+      "Something went wrong. Try again." +
+        (err.response?.data?.detail ? ` (${err.response.data.detail})` : ""),
+    );
+
   const fetchHistory = async () => {
     setError("");
     setLoading(true);
     try {
-      const params = {};
-      if (selectedName) params.name = selectedName;
-      if (fromDate) params.from = fromDate;
-      if (toDate) params.to = toDate;
-      const res = await getPublicHistory(params);
+      const res = await getPublicHistory(historyParams());
       setRecords(res.data.data || []);
+      setNextCursor(res.data.next_cursor || null);
     } catch (err) {
-      setError(
-        "Something went wrong. Try again." +
-          (err.response?.data?.detail ? ` (${err.response.data.detail})` : ""),
-      );
+      showError(err);
       setRecords([]);
+      setNextCursor(null);
     } finally {
       setLoading(false);
       setInitialLoad(false);
     }
   };
 
+  const loadMore = async () => {
+    setLoadingMore(true);
+    try {
+      const res = await getPublicHistory({ ...historyParams(), cursor: nextCursor });
+      setRecords((prev) => [...prev, ...(res.data.data || [])]);
+      setNextCursor(res.data.next_cursor || null);
+    } catch (err) {
+      showError(err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const statusBadge = (s) => {
     const colors =
       s === "present"
@@ -491,11 +515,24 @@ export default function UserHistoryPage() {
           </div>
         )}
 
+        {!loading && nextCursor && (
+          <div className="flex justify-center mt-6">
+            <button
+              onClick={loadMore}
+              disabled={loadingMore}
+              className="rounded-xl px-4 py-2.5 text-sm font-medium transition-all duration-200 disabled:opacity-40"
+              style={{ background: "rgba(6,182,212,0.15)", color: "#22d3ee" }}
+            >
+              {loadingMore ? "Loading…" : "Load older records"}
+            </button>
+          </div>
+        )}
+
         <p className="text-center text-gray-500 text-xs mt-6">
           {!loading &&
             !initialLoad &&
             records.length > 0 &&
-            `${records.length} record${records.length !== 1 ? "s" : ""} found`}
+            `${records.length}${nextCursor ? "+" : ""} record${records.length !== 1 ? "s" : ""} found`}
         </p>
       </div>
     </div>
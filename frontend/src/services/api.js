@@ -8,7 +8,8 @@ const api = axios.create({
 
 export const imageUrl = (path) => {
   if (!path) return null;
-  if (!import.meta.env.VITE_API_URL) return path;
+  // R2 URLs are absolute; captures still in the upload spool are served by the API
+  if (/^https?:\/\//.test(path) || !import.meta.env.VITE_API_URL) return path;
   const serverBase = import.meta.env.VITE_API_URL.replace(/\/api\/v1\/?$/, "");
   return `${serverBase}${path}`;
 };
@@ -44,8 +45,10 @@ export const registerByAdmin = (unique_name, imageFiles, email) => {
 export const deleteTrainee = (id) => api.delete(`/trainees/${id}`);
 
 // Attendance
-export const checkin = (frame) => api.post("/attendance/checkin", { frame });
-export const checkout = (frame) => api.post("/attendance/checkout", { frame });
+export const checkin = (frame, ticket) =>
+  api.post("/attendance/checkin", { frame, ticket });
+export const checkout = (frame, ticket) =>
+  api.post("/attendance/checkout", { frame, ticket });
 export const identifyFace = (frame) =>
   api.post("/attendance/identify", { frame });
 
@@ -54,6 +57,19 @@ export const getMyAttendance = (params) =>
   api.get("/attendance/my", { params });
 export const getPublicHistory = (params) =>
   api.get("/attendance/history", { params });
+
+// Attendance lists are paginated: follow next_cursor until the last page.
+// Only for views that need every row, e.g. a single day on the dashboard.
+export const fetchAllPages = async (request, params) => {
+  const rows = [];
+  let cursor;
+  do {
+    const res = await request(cursor ? { ...params, cursor } : params);
+    rows.push(...(res.data.data || []));
+    cursor = res.data.next_cursor;
+  } while (cursor);
+  return rows;
+};
 export const getPublicTrainees = () => api.get("/trainees/public");
 export const patchAttendance = (id, data) =>
   api.patch(`/attendance/${id}`, data);
@@ -65,6 +81,11 @@ export const exportReport = (format, from, to) =>
     params: { format, from, to },
     responseType: "blob",
   });
+export const submitReportJob = (format, from, to) =>
+  api.post("/reports/jobs", { format, from_date: from, to_date: to });
+export const getReportJob = (id) => api.get(`/reports/jobs/${id}`);
+export const downloadReportJob = (id) =>
+  api.get(`/reports/jobs/${id}/download`, { responseType: "blob" });
 
 // Settings
 export const getSettings = () => api.get("/settings");